@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { spawn } from "node:child_process";
+import { createHash } from "node:crypto";
 import { existsSync } from "node:fs";
 import fs from "node:fs/promises";
 import path from "node:path";
@@ -14,15 +15,59 @@ const resolvePath = (value: string) => {
   return path.resolve(process.cwd(), value);
 };
 
-const getDuration = async (filePath: string) =>
-  new Promise<number>((resolve, reject) => {
+// media_probe.py와 같은 캐시(storage/cache/media_probe/<sha1(절대경로)>.json)를 공유합니다.
+const PROBE_CACHE_DIR = path.join(
+  process.env.CACHE_DIR
+    ? resolvePath(process.env.CACHE_DIR)
+    : path.join(process.cwd(), "storage", "cache"),
+  "media_probe"
+);
+
+type ProbeStream = { codec_type?: string; duration?: string };
+type ProbeInfo = { duration: number };
+
+const cacheFileFor = (filePath: string) =>
+  path.join(
+    PROBE_CACHE_DIR,
+    `${createHash("sha1").update(filePath, "utf8").digest("hex")}.json`
+  );
+
+const readProbeCache = async (
+  filePath: string,
+  size: bigint,
+  mtimeNs: bigint
+): Promise<ProbeInfo | null> => {
+  try {
+    const raw = await fs.readFile(cacheFileFor(filePath), "utf8");
+    const entry = JSON.parse(raw) as {
+      size?: number;
+      mtime_ns?: string;
+      info?: ProbeInfo;
+    };
+    // mtime_ns는 Number 정밀도를 넘으므로 media_probe.py가 문자열로 저장합니다.
+    if (
+      entry.info &&
+      typeof entry.mtime_ns === "string" &&
+      BigInt(entry.size ?? -1) === size &&
+      entry.mtime_ns === mtimeNs.toString()
+    ) {
+      return entry.info;
+    }
+  } catch {
+    return null;
+  }
+  return null;
+};
+
+const runProbe = async (filePath: string) =>
+  new Promise<Record<string, unknown>>((resolve, reject) => {
     const child = spawn("ffprobe", [
       "-v",
       "error",
-      "-show_entries",
-      "format=duration",
-      "-of",
-      "default=noprint_wrappers=1:nokey=1",
+      "-print_format",
+      "json",
+      "-show_format",
+      "-show_streams",
       filePath
     ]);
     let stdout = "";
@@ -35,14 +80,67 @@ const getDuration = async (filePath: string) =>
     });
     child.on("close", (code) => {
       if (code === 0) {
-        const parsed = Number.parseFloat(stdout.trim());
-        resolve(Number.isFinite(parsed) ? parsed : 0);
+        try {
+          resolve(JSON.parse(stdout || "{}"));
+        } catch (error) {
+          reject(error);
+        }
       } else {
         reject(new Error(stderr || "ffprobe failed"));
       }
     });
   });
 
+const parseRate = (value?: string) => {
+  if (!value) return 0;
+  const [num, den] = value.split("/");
+  const parsed = den ? Number(num) / Number(den) : Number(num);
+  return Number.isFinite(parsed) ? parsed : 0;
+};
+
+const getDuration = async (filePath: string) => {
+  const stat = await fs.stat(filePath, { bigint: true });
+  const cached = await readProbeCache(filePath, stat.size, stat.mtimeNs);
+  if (cached) return cached.duration;
+
+  const payload = await runProbe(filePath);
+  const streams = (payload.streams ?? []) as (ProbeStream & Record<string, any>)[];
+  const video = streams.find((s) => s.codec_type === "video");
+  const audio = streams.find((s) => s.codec_type === "audio");
+  const format = (payload.format ?? {}) as { duration?: string };
+  let duration = Number.parseFloat(format.duration ?? "");
+  if (!Number.isFinite(duration) || duration <= 0) {
+    duration = Number.parseFloat(video?.duration ?? "");
+  }
+  if (!Number.isFinite(duration)) duration = 0;
+  const info = {
+    duration,
+    width: Number(video?.width ?? 0),
+    height: Number(video?.height ?? 0),
+    video_codec: video?.codec_name ?? null,
+    audio_codec: audio?.codec_name ?? null,
+    fps: parseRate(video?.avg_frame_rate) || parseRate(video?.r_frame_rate),
+    has_video: Boolean(video),
+    has_audio: Boolean(audio)
+  };
+  try {
+    await fs.mkdir(PROBE_CACHE_DIR, { recursive: true });
+    await fs.writeFile(
+      cacheFileFor(filePath),
+      JSON.stringify({
+        path: filePath,
+        size: Number(stat.size),
+        mtime_ns: stat.mtimeNs.toString(),
+        info
+      }),
+      "utf8"
+    );
+  } catch {
+    // 캐시 쓰기 실패는 검증 결과에 영향을 주지 않습니다.
+  }
+  return duration;
+};
+
 export const POST = async (request: Request) => {
   try {
     const body = (await request.json().catch(() => ({}))) as {
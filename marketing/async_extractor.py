@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright_stealth.stealth import Stealth
+
+import dedup_index
+from browser_pool import AsyncBrowserPool
+from download_pool import host_key, parse_host_limits, resolve_download_workers
+from downloader_v2 import (
+    PAGE_JSON_KEYS,
+    PERF_URLS_JS,
+    REVIEW_SELECTORS,
+    REVIEW_VIDEO_SELECTORS,
+    SOURCE_SRC_JS,
+    VIDEO_SRC_JS,
+    DownloadResult,
+    append_network_dump,
+    download_source,
+    find_video_urls_in_json,
+    is_video_response,
+    normalize_mobile_url,
+    record_result,
+    release_target_path,
+    resolve_target_path,
+    sources_from_body,
+    sources_from_html,
+    wants_body,
+)
+
+
+class _HostLimiter:
+    """추출 도메인별 동시 탭 수 제한. EXTRACT_HOST_LIMITS=aliexpress.com=6,... 형식."""
+
+    def __init__(self, per_host: int, limits: dict[str, int]) -> None:
+        self.per_host = per_host
+        self.limits = limits
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def get(self, url: str) -> asyncio.Semaphore:
+        host = host_key(url)
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            limit = self.limits.get(host, self.per_host)
+            semaphore = self._semaphores[host] = asyncio.Semaphore(limit)
+        return semaphore
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key) or default))
+    except ValueError:
+        return default
+
+
+async def _extract(
+    page,
+    page_url: str,
+    emit: Callable[[str], None],
+    settle: Callable[[float], Awaitable[None]],
+) -> None:
+    """sync 경로와 같은 상호작용을 하되, 고정 sleep 대신 새 소스가 잡히면 바로 넘어갑니다."""
+
+    async def handle_response(response) -> None:
+        url = response.url
+        content_type = response.headers.get("content-type", "")
+        append_network_dump(url, content_type)
+        if is_video_response(url, content_type, response.request.resource_type):
+            emit(url)
+            return
+        if wants_body(url, content_type):
+            try:
+                text = await response.text()
+            except Exception:
+                return
+            for found in sources_from_body(text):
+                emit(found)
+
+    page.on("response", handle_response)
+    await page.goto(
+        normalize_mobile_url(page_url), wait_until="domcontentloaded", timeout=60000
+    )
+    await settle(10.0 + random.uniform(2.5, 4.0))
+
+    try:
+        await page.wait_for_selector("video", timeout=8000)
+    except PlaywrightTimeoutError:
+        pass
+
+    for _ in range(2):
+        await page.mouse.wheel(0, 1200)
+        await settle(random.uniform(1.0, 2.5))
+
+    try:
+        size = page.viewport_size or {"width": 1280, "height": 720}
+        await page.mouse.click(size["width"] // 2, size["height"] // 2)
+        await settle(3.0)
+    except Exception:
+        pass
+
+    try:
+        await page.click("video", timeout=1500)
+        await settle(random.uniform(1.0, 2.0))
+    except PlaywrightTimeoutError:
+        pass
+
+    try:
+        for selector in REVIEW_SELECTORS:
+            locator = page.locator(selector).first
+            if await locator.is_visible():
+                await locator.click()
+                await settle(random.uniform(2.0, 3.0))
+                break
+    except Exception:
+        pass
+
+    try:
+        for selector in REVIEW_VIDEO_SELECTORS:
+            locator = page.locator(selector)
+            if await locator.count() > 0:
+                await locator.first.click()
+                await settle(3.0)
+                break
+    except Exception:
+        pass
+
+    try:
+        await page.wait_for_selector("video", state="attached", timeout=10000)
+    except PlaywrightTimeoutError:
+        pass
+
+    for src in await page.eval_on_selector_all("video", VIDEO_SRC_JS):
+        emit(src)
+    for src in await page.eval_on_selector_all("video source", SOURCE_SRC_JS):
+        emit(src)
+    for key in PAGE_JSON_KEYS:
+        try:
+            data = await page.evaluate(f"() => window.{key} || null")
+        except Exception:
+            continue
+        if data:
+            for found in find_video_urls_in_json(data):
+                emit(found)
+    try:
+        for url in await page.evaluate(PERF_URLS_JS):
+            if ".mp4" in url or ".m3u8" in url:
+                emit(url)
+    except Exception:
+        pass
+    try:
+        for found in sources_from_html(await page.content()):
+            emit(found)
+    except Exception:
+        pass
+
+
+class _Batch:
+    def __init__(
+        self,
+        manager,
+        storage_state: str | None,
+        pool: AsyncBrowserPool,
+        concurrency: int,
+    ) -> None:
+        self.manager = manager
+        self.storage_state = storage_state
+        self.pool = pool
+        self.budget = asyncio.Semaphore(concurrency)
+        # 도메인 한도는 따로 정하지 않으면 전체 예산과 같습니다(상품이 대부분 한 도메인).
+        per_host = _env_int("EXTRACT_PER_HOST", concurrency)
+        host_limits = parse_host_limits(os.getenv("EXTRACT_HOST_LIMITS"))
+        for host, limit in [("*", per_host), *host_limits.items()]:
+            if limit < concurrency:
+                print(
+                    f"⚠️ EXTRACT host limit {host}={limit} "
+                    f"< concurrency={concurrency}: 이 도메인은 {limit}개 탭까지만 엽니다."
+                )
+        self.hosts = _HostLimiter(per_host, host_limits)
+        # 다운로드/지문은 스레드에서, DB 기록과 중복 검사는 한 스레드에서 순서대로 합니다.
+        self.downloads = ThreadPoolExecutor(
+            max_workers=resolve_download_workers(), thread_name_prefix="extract-dl"
+        )
+        self.records = ThreadPoolExecutor(max_workers=1, thread_name_prefix="record")
+
+    def close(self) -> None:
+        self.downloads.shutdown(wait=True)
+        self.records.shutdown(wait=True)
+
+    async def process(self, product) -> DownloadResult:
+        # 한 상품의 실패(DB 기록, 지문 계산 등)가 배치 전체와 풀을 중단시키지 않게 합니다.
+        target_path: Path | None = None
+        try:
+            target_path = resolve_target_path(product.title or "상품")
+            return await self._process(product, target_path)
+        except Exception as exc:
+            print(f"EXTRACT_FAILED {product.origin_url}: {exc}")
+            return DownloadResult(
+                product_id=str(product.id),
+                origin_url=product.origin_url,
+                raw_path=None,
+                success=False,
+                message=f"error: {exc}",
+            )
+        finally:
+            if target_path is not None:
+                release_target_path(target_path)
+
+    async def _process(self, product, target_path: Path) -> DownloadResult:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        new_source = asyncio.Event()
+        seen: set[str] = set()
+
+        def emit(url: str) -> None:
+            if not url or url in seen or url.startswith("blob:"):
+                return
+            seen.add(url)
+            print(f"FOUND_VIDEO_URL {product.origin_url} -> {url}")
+            queue.put_nowait(url)
+            new_source.set()
+
+        async def settle(seconds: float) -> None:
+            new_source.clear()
+            try:
+                await asyncio.wait_for(new_source.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        async def extract() -> None:
+            try:
+                # 도메인 한도를 먼저 잡아야 한도에 걸린 상품이 전체 예산을 붙잡지 않습니다.
+                async with self.hosts.get(product.origin_url), self.budget:
+                    async with self.pool.page(self.storage_state) as page:
+                        await Stealth().apply_stealth_async(page)
+                        await _extract(page, product.origin_url, emit, settle)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"EXTRACT_FAILED {product.origin_url}: {exc}")
+            finally:
+                queue.put_nowait(None)
+
+        # 소스가 잡히는 즉시 다운로드를 시작하고, 성공하면 남은 상호작용은 취소합니다.
+        extractor = asyncio.create_task(extract())
+        raw_path: Path | None = None
+        try:
+            while True:
+                src = await queue.get()
+                if src is None:
+                    break
+                ok = await loop.run_in_executor(
+                    self.downloads, download_source, src, target_path
+                )
+                if ok:
+                    raw_path = target_path
+                    break
+        finally:
+            if not extractor.done():
+                extractor.cancel()
+            try:
+                await extractor
+            except asyncio.CancelledError:
+                pass
+
+        frame_hashes = None
+        if raw_path:
+            frame_hashes = await loop.run_in_executor(
+                self.downloads, dedup_index.fingerprint_video, raw_path
+            )
+        return await loop.run_in_executor(
+            self.records, record_result, self.manager, product, raw_path, frame_hashes
+        )
+
+
+async def _run_batch(
+    manager, products: list[Any], storage_state: str | None, concurrency: int
+) -> list[DownloadResult]:
+    pool = AsyncBrowserPool(storage_state=storage_state)
+    # 전체 탭 예산을 담을 만큼 브라우저 수를 늘립니다.
+    per_browser = pool.max_contexts * pool.pages_per_context
+    pool.size = max(pool.size, -(-concurrency // per_browser))
+    batch = _Batch(manager, storage_state, pool, concurrency)
+    started = time.perf_counter()
+    try:
+        async with pool:
+            results = await asyncio.gather(
+                *(batch.process(product) for product in products)
+            )
+            print(f"BROWSER_POOL {pool.stats()}")
+    finally:
+        batch.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"EXTRACT_BATCH products={len(products)} concurrency={concurrency} "
+        f"elapsed={elapsed:.1f}s"
+    )
+    return list(results)
+
+
+def run_batch(
+    manager, products: list[Any], storage_state: str | None, concurrency: int
+) -> list[DownloadResult]:
+    """상품 페이지를 concurrency개 탭까지 동시에 열어 추출하고, 찾은 소스는 바로 받습니다."""
+    return asyncio.run(_run_batch(manager, products, storage_state, concurrency))
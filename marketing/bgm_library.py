@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+BGM_SOURCE_DIR = Path(os.getenv("BGM_DIR") or "video_bgm")
+BGM_CACHE_DIR = CACHE_DIR / "bgm"
+LOOP_LENGTHS = (15, 30, 60)
+# 렌더에서 쓰던 volume=0.3을 라우드니스 정규화 뒤에 미리 적용해 둡니다.
+BGM_GAIN = 0.3
+_LOUDNORM = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+
+@dataclass
+class BgmAsset:
+    path: Path
+    source: Path
+    length_sec: int | None
+    needs_loop: bool
+    volume: float
+
+
+class BgmLibrary:
+    """video_bgm/ 폴더를 한 번 색인하고, 길이별로 미리 루프/정규화한 AAC 트랙을 캐시합니다."""
+
+    def __init__(
+        self,
+        source_dir: Path = BGM_SOURCE_DIR,
+        cache_dir: Path = BGM_CACHE_DIR,
+        lengths: tuple[int, ...] = LOOP_LENGTHS,
+    ) -> None:
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.lengths = tuple(sorted(lengths))
+        self._lock = threading.Lock()
+        self._dir_mtime_ns: int | None = None
+        self._tracks: list[Path] = []
+        self._assets: dict[tuple[str, int], Path] = {}
+        self._building: dict[tuple[str, int], threading.Event] = {}
+
+    def _refresh_index(self) -> None:
+        try:
+            mtime_ns = self.source_dir.stat().st_mtime_ns
+        except OSError:
+            self._tracks = []
+            self._dir_mtime_ns = None
+            return
+        if mtime_ns == self._dir_mtime_ns:
+            return
+        tracks: list[Path] = []
+        tracks.extend(self.source_dir.glob("*.mp3"))
+        tracks.extend(self.source_dir.glob("*.wav"))
+        self._tracks = tracks
+        self._dir_mtime_ns = mtime_ns
+        self._assets = {}
+
+    def tracks(self) -> list[Path]:
+        with self._lock:
+            self._refresh_index()
+            return list(self._tracks)
+
+    def _asset_path(self, source: Path, length: int) -> Path:
+        stat = source.stat()
+        return self.cache_dir / (
+            f"{source.stem}_{stat.st_size}_{stat.st_mtime_ns}_{length}s.m4a"
+        )
+
+    def _build_asset(self, source: Path, length: int) -> Path | None:
+        target = self._asset_path(source, length)
+        if target.exists():
+            return target
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_target = target.with_name(f"{target.stem}.{threading.get_ident()}.tmp.m4a")
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-stream_loop",
+            "-1",
+            "-i",
+            str(source),
+            "-t",
+            str(length),
+            "-af",
+            f"{_LOUDNORM},volume={BGM_GAIN},aresample=48000",
+            "-ar",
+            "48000",
+            "-ac",
+            "2",
+            "-c:a",
+            "aac",
+            "-b:a",
+            "128k",
+            str(tmp_target),
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, check=False)
+        except FileNotFoundError:
+            return None
+        if result.returncode != 0 or not tmp_target.exists():
+            tmp_target.unlink(missing_ok=True)
+            return None
+        os.replace(tmp_target, target)
+        return target
+
+    def _asset_for(self, source: Path, length: int) -> Path | None:
+        """락 밖에서 인코딩하고, 같은 (원본, 길이)를 만드는 중이면 그 결과를 기다립니다."""
+        key = (str(source), length)
+        with self._lock:
+            cached = self._assets.get(key)
+            if cached is not None:
+                return cached
+            pending = self._building.get(key)
+            if pending is None:
+                self._building[key] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            with self._lock:
+                return self._assets.get(key)
+        built = None
+        try:
+            built = self._build_asset(source, length)
+        finally:
+            with self._lock:
+                if built is not None:
+                    self._assets[key] = built
+                self._building.pop(key).set()
+        return built
+
+    def pick(self, duration: float) -> BgmAsset | None:
+        """영상 길이에 맞는 가장 짧은 사전 처리 루프를 고릅니다. 없으면 원본을 그대로 씁니다."""
+        with self._lock:
+            self._refresh_index()
+            if not self._tracks:
+                return None
+            source = self._tracks[0]
+        length = next(
+            (value for value in self.lengths if value >= duration),
+            self.lengths[-1] if self.lengths else None,
+        )
+        if length is not None:
+            asset = self._asset_for(source, length)
+            if asset is not None:
+                return BgmAsset(
+                    path=asset,
+                    source=source,
+                    length_sec=length,
+                    needs_loop=duration > length,
+                    volume=1.0,
+                )
+        return BgmAsset(
+            path=source,
+            source=source,
+            length_sec=None,
+            needs_loop=True,
+            volume=BGM_GAIN,
+        )
+
+    def prepare_all(self) -> list[Path]:
+        prepared: list[Path] = []
+        for source in self.tracks():
+            for length in self.lengths:
+                asset = self._asset_for(source, length)
+                if asset is not None:
+                    prepared.append(asset)
+        return prepared
+
+
+_default_library: BgmLibrary | None = None
+
+
+def get_bgm_library() -> BgmLibrary:
+    global _default_library
+    if _default_library is None:
+        _default_library = BgmLibrary()
+    return _default_library
+
+
+def main() -> None:
+    for path in get_bgm_library().prepare_all():
+        print(f"BGM_READY {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any
+
+import http_client
+from render_cache import content_hash, remember_hash
+from storage_paths import BLOBS_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+INCOMING_DIR = BLOBS_DIR / "incoming"
+_lock = threading.Lock()
+
+
+def blob_path(digest: str, suffix: str = ".mp4") -> Path:
+    return BLOBS_DIR / digest[:2] / f"{digest}{suffix}"
+
+
+def _refs_path(blob: Path) -> Path:
+    return blob.with_name(f"{blob.name}.refs.json")
+
+
+def _read_refs(blob: Path) -> list[str]:
+    try:
+        refs = json.loads(_refs_path(blob).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return [ref for ref in refs if isinstance(ref, str)]
+
+
+def _write_refs(blob: Path, refs: list[str]) -> None:
+    path = _refs_path(blob)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(sorted(set(refs)), ensure_ascii=False), "utf-8")
+    os.replace(tmp_path, path)
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_name(f".{target.name}.{threading.get_ident()}.link")
+    try:
+        os.link(source, tmp_target)
+    except OSError:
+        # 다른 볼륨이면 하드링크가 안 되므로 복사합니다(중복 제거는 포기).
+        shutil.copy2(source, tmp_target)
+    os.replace(tmp_target, target)
+
+
+def _same_file(left: Path, right: Path) -> bool:
+    try:
+        return os.path.samefile(left, right)
+    except OSError:
+        return False
+
+
+def ingest(source: Path, digest: str, link_path: Path) -> Path:
+    """source를 해시 이름의 blob으로 옮기고 link_path(제목 이름)에 하드링크를 겁니다.
+
+    같은 해시의 blob이 이미 있으면 source는 버리고 기존 blob을 공유합니다.
+    """
+    blob = blob_path(digest, source.suffix or ".mp4")
+    with _lock:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            if not _same_file(source, blob):
+                source.unlink(missing_ok=True)
+            print(f"BLOB_DEDUP {digest[:12]} -> {link_path}")
+        else:
+            os.replace(source, blob)
+        if not _same_file(link_path, blob):
+            _link_or_copy(blob, link_path)
+        refs = _read_refs(blob)
+        refs.append(os.path.abspath(link_path))
+        _write_refs(blob, refs)
+    remember_hash(link_path, digest)
+    return link_path
+
+
+def ingest_file(source: Path, link_path: Path) -> Path:
+    """다운로드 밖에서 만든 파일(HLS 리먹싱 결과 등)을 해시해서 blob으로 넣습니다."""
+    return ingest(source, http_client.file_sha256(source), link_path)
+
+
+def download(
+    url: str, link_path: Path, **kwargs: Any
+) -> http_client.DownloadInfo:
+    """스트리밍하면서 sha256을 계산해 blob으로 저장하고 link_path에 연결합니다."""
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    # URL+대상 이름별로 고정된 임시 경로라서 재시도 때 .part 이어받기가 동작합니다.
+    key = hashlib.sha1(f"{url}\n{link_path.name}".encode("utf-8")).hexdigest()
+    incoming = INCOMING_DIR / f"{key}{link_path.suffix or '.mp4'}"
+    info = http_client.stream_to_file(url, incoming, sha256=True, **kwargs)
+    ingest(incoming, info.sha256 or "", link_path)
+    info.path = link_path
+    return info
+
+
+def release(link_path: Path) -> bool:
+    """제목 링크를 지우고 참조가 없어진 blob도 함께 삭제합니다."""
+    digest = content_hash(link_path)
+    if not digest:
+        link_path.unlink(missing_ok=True)
+        return False
+    blob = blob_path(digest, link_path.suffix or ".mp4")
+    with _lock:
+        refs = [ref for ref in _read_refs(blob) if ref != os.path.abspath(link_path)]
+        link_path.unlink(missing_ok=True)
+        if refs:
+            _write_refs(blob, refs)
+            return True
+        blob.unlink(missing_ok=True)
+        _refs_path(blob).unlink(missing_ok=True)
+    return True
+
+
+def move(link_path: Path, new_path: Path) -> Path:
+    """제목 링크 이름을 바꾸고 blob 참조도 새 이름으로 옮깁니다."""
+    if new_path.exists() and not _same_file(link_path, new_path):
+        release(new_path)
+    digest = content_hash(link_path)
+    blob = blob_path(digest, link_path.suffix or ".mp4") if digest else None
+    with _lock:
+        os.replace(link_path, new_path)
+        if blob is not None and blob.exists():
+            old_ref = os.path.abspath(link_path)
+            refs = [ref for ref in _read_refs(blob) if ref != old_ref]
+            refs.append(os.path.abspath(new_path))
+            _write_refs(blob, refs)
+    if digest:
+        remember_hash(new_path, digest)
+    return new_path
+
+
+def gc() -> int:
+    """사라졌거나 다른 파일로 바뀐 참조를 정리하고, 참조가 없는 blob을 지웁니다."""
+    removed = 0
+    with _lock:
+        for refs_file in BLOBS_DIR.glob("*/*.refs.json"):
+            blob = refs_file.with_name(refs_file.name[: -len(".refs.json")])
+            refs = [ref for ref in _read_refs(blob) if _same_file(Path(ref), blob)]
+            if refs:
+                _write_refs(blob, refs)
+                continue
+            blob.unlink(missing_ok=True)
+            refs_file.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def stats() -> dict[str, int]:
+    blobs = 0
+    total_bytes = 0
+    refs = 0
+    for refs_file in BLOBS_DIR.glob("*/*.refs.json"):
+        blob = refs_file.with_name(refs_file.name[: -len(".refs.json")])
+        try:
+            total_bytes += blob.stat().st_size
+        except OSError:
+            continue
+        blobs += 1
+        refs += len(_read_refs(blob))
+    return {"blobs": blobs, "bytes": total_bytes, "refs": refs}
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Content-addressed raw blob store.")
+    parser.add_argument("--gc", action="store_true", help="참조 없는 blob 정리")
+    args = parser.parse_args()
+    if args.gc:
+        print(f"BLOB_GC removed={gc()}")
+    print(f"BLOB_STATS {stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator
+
+
+DEFAULT_DEVICE = "iPhone 14 Pro"
+DEFAULT_LOCALE = "ko-KR"
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key) or default))
+    except ValueError:
+        return default
+
+
+@dataclass
+class _BrowserSlot:
+    browser: Any
+    uses: int = 0
+    open_pages: int = 0
+    idle_contexts: dict[str | None, list[Any]] = field(default_factory=dict)
+    busy_contexts: int = 0
+
+    @property
+    def context_count(self) -> int:
+        idle = sum(len(items) for items in self.idle_contexts.values())
+        return idle + self.busy_contexts
+
+
+class PoolExhausted(RuntimeError):
+    """모든 브라우저가 페이지/컨텍스트 상한에 걸려 새 페이지를 열 수 없습니다."""
+
+
+class BrowserPool:
+    """Chromium을 띄워 둔 채 컨텍스트를 재사용하는 Playwright(sync) 풀.
+
+    sync API 객체는 만든 스레드에서만 쓸 수 있으므로 풀 하나는 한 스레드에서만 사용합니다.
+    브라우저는 max_uses 페이지를 연 뒤 닫고 다시 띄워 메모리 누수를 끊습니다.
+    """
+
+    def __init__(
+        self,
+        storage_state: str | None = None,
+        size: int | None = None,
+        max_contexts: int | None = None,
+        max_pages: int | None = None,
+        max_uses: int | None = None,
+        device: str = DEFAULT_DEVICE,
+        locale: str = DEFAULT_LOCALE,
+        headless: bool = True,
+    ) -> None:
+        self.storage_state = storage_state
+        self.size = size or _env_int("BROWSER_POOL_SIZE", 1)
+        self.max_contexts = max_contexts or _env_int("BROWSER_MAX_CONTEXTS", 4)
+        self.max_pages = max_pages or _env_int("BROWSER_MAX_PAGES", 4)
+        self.max_uses = max_uses or _env_int("BROWSER_MAX_USES", 30)
+        self.device = device
+        self.locale = locale
+        self.headless = headless
+        self._manager = None
+        self._playwright = None
+        self._slots: list[_BrowserSlot] = []
+        self.launches = 0
+        self.pages_served = 0
+
+    def __enter__(self) -> "BrowserPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._playwright is not None:
+            return
+        from playwright.sync_api import sync_playwright
+
+        self._manager = sync_playwright()
+        self._playwright = self._manager.start()
+
+    def close(self) -> None:
+        for slot in list(self._slots):
+            self._retire(slot)
+        if self._manager is not None:
+            self._manager.__exit__(None, None, None)
+        self._manager = None
+        self._playwright = None
+
+    def _launch(self) -> _BrowserSlot:
+        browser = self._playwright.chromium.launch(headless=self.headless)
+        slot = _BrowserSlot(browser=browser)
+        self._slots.append(slot)
+        self.launches += 1
+        return slot
+
+    def _retire(self, slot: _BrowserSlot) -> None:
+        if slot in self._slots:
+            self._slots.remove(slot)
+        for contexts in slot.idle_contexts.values():
+            for context in contexts:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+        slot.idle_contexts.clear()
+        try:
+            slot.browser.close()
+        except Exception:
+            pass
+
+    def _has_room(self, slot: _BrowserSlot, storage_state: str | None) -> bool:
+        if slot.open_pages >= self.max_pages or slot.uses >= self.max_uses:
+            return False
+        if slot.idle_contexts.get(storage_state):
+            return True
+        return slot.context_count < self.max_contexts
+
+    def _pick_slot(self, storage_state: str | None) -> _BrowserSlot:
+        for slot in list(self._slots):
+            if not slot.browser.is_connected():
+                print("BROWSER_POOL browser disconnected, relaunching")
+                self._retire(slot)
+        candidates = [s for s in self._slots if self._has_room(s, storage_state)]
+        if candidates:
+            return min(candidates, key=lambda slot: slot.open_pages)
+        if len(self._slots) < self.size:
+            return self._launch()
+        # 사용 횟수를 다 채운 브라우저가 비어 있으면 그 자리를 새 브라우저로 바꿉니다.
+        for slot in self._slots:
+            if slot.uses >= self.max_uses and slot.open_pages == 0:
+                self._retire(slot)
+                return self._launch()
+        raise PoolExhausted(
+            f"pool full: {len(self._slots)} browsers x {self.max_pages} pages"
+        )
+
+    def _acquire_context(self, slot: _BrowserSlot, storage_state: str | None):
+        idle = slot.idle_contexts.get(storage_state)
+        if idle:
+            context = idle.pop()
+        else:
+            device = self._playwright.devices.get(self.device) or {}
+            context = slot.browser.new_context(
+                **device,
+                locale=self.locale,
+                storage_state=storage_state or None,
+            )
+        slot.busy_contexts += 1
+        return context
+
+    def _release_context(
+        self, slot: _BrowserSlot, storage_state: str | None, context, healthy: bool
+    ) -> None:
+        slot.busy_contexts -= 1
+        if healthy and slot in self._slots:
+            slot.idle_contexts.setdefault(storage_state, []).append(context)
+            return
+        try:
+            context.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def page(self, storage_state: str | None = None) -> Iterator[Any]:
+        """재사용 컨텍스트 위에 새 페이지를 열고, 끝나면 페이지만 닫아 컨텍스트를 돌려놓습니다."""
+        if self._playwright is None:
+            self.start()
+        storage_state = storage_state or self.storage_state
+        slot = self._pick_slot(storage_state)
+        context = self._acquire_context(slot, storage_state)
+        slot.uses += 1
+        slot.open_pages += 1
+        self.pages_served += 1
+        healthy = False
+        page = None
+        try:
+            page = context.new_page()
+            yield page
+            healthy = True
+        finally:
+            if page is not None:
+                try:
+                    page.close()
+                except Exception:
+                    healthy = False
+            slot.open_pages -= 1
+            self._release_context(slot, storage_state, context, healthy)
+            if slot.uses >= self.max_uses and slot.open_pages == 0:
+                print(f"BROWSER_POOL recycle after {slot.uses} pages")
+                self._retire(slot)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "browsers": len(self._slots),
+            "contexts": sum(slot.context_count for slot in self._slots),
+            "open_pages": sum(slot.open_pages for slot in self._slots),
+            "launches": self.launches,
+            "pages_served": self.pages_served,
+        }
+
+
+@dataclass
+class _AsyncContext:
+    context: Any
+    storage_state: str | None
+    open_pages: int = 0
+
+
+@dataclass
+class _AsyncSlot:
+    browser: Any
+    uses: int = 0
+    open_pages: int = 0
+    retiring: bool = False
+    contexts: list[_AsyncContext] = field(default_factory=list)
+
+
+class AsyncBrowserPool:
+    """playwright.async_api 버전. 한 이벤트 루프에서 여러 컨텍스트에 탭을 나눠 동시에 엽니다.
+
+    브라우저당 max_contexts개, 컨텍스트당 pages_per_context개까지 탭을 열고, 자리가 없으면
+    탭이 닫힐 때까지 기다립니다. max_uses 탭을 연 브라우저는 새 탭을 받지 않다가
+    열린 탭이 모두 닫히면 종료되고, 그 자리는 새 브라우저가 채웁니다.
+    """
+
+    def __init__(
+        self,
+        storage_state: str | None = None,
+        size: int | None = None,
+        max_contexts: int | None = None,
+        pages_per_context: int | None = None,
+        max_uses: int | None = None,
+        device: str = DEFAULT_DEVICE,
+        locale: str = DEFAULT_LOCALE,
+        headless: bool = True,
+    ) -> None:
+        self.storage_state = storage_state
+        self.size = size or _env_int("BROWSER_POOL_SIZE", 1)
+        self.max_contexts = max_contexts or _env_int("BROWSER_MAX_CONTEXTS", 4)
+        self.pages_per_context = pages_per_context or _env_int(
+            "BROWSER_PAGES_PER_CONTEXT", 4
+        )
+        self.max_uses = max_uses or _env_int("BROWSER_MAX_USES", 30)
+        self.device = device
+        self.locale = locale
+        self.headless = headless
+        self._manager = None
+        self._playwright = None
+        self._slots: list[_AsyncSlot] = []
+        self._condition: asyncio.Condition | None = None
+        self.launches = 0
+        self.pages_served = 0
+
+    async def __aenter__(self) -> "AsyncBrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        if self._playwright is not None:
+            return
+        from playwright.async_api import async_playwright
+
+        self._condition = asyncio.Condition()
+        self._manager = async_playwright()
+        self._playwright = await self._manager.start()
+
+    async def close(self) -> None:
+        for slot in list(self._slots):
+            await self._retire(slot)
+        if self._manager is not None:
+            await self._manager.__aexit__(None, None, None)
+        self._manager = None
+        self._playwright = None
+
+    async def _retire(self, slot: _AsyncSlot) -> None:
+        if slot in self._slots:
+            self._slots.remove(slot)
+        for holder in slot.contexts:
+            try:
+                await holder.context.close()
+            except Exception:
+                pass
+        slot.contexts.clear()
+        try:
+            await slot.browser.close()
+        except Exception:
+            pass
+
+    async def _new_context(
+        self, slot: _AsyncSlot, storage_state: str | None
+    ) -> _AsyncContext:
+        device = self._playwright.devices.get(self.device) or {}
+        context = await slot.browser.new_context(
+            **device,
+            locale=self.locale,
+            storage_state=storage_state or None,
+        )
+        holder = _AsyncContext(context=context, storage_state=storage_state)
+        slot.contexts.append(holder)
+        return holder
+
+    async def _pick(
+        self, storage_state: str | None
+    ) -> tuple[_AsyncSlot, _AsyncContext] | None:
+        for slot in list(self._slots):
+            if not slot.browser.is_connected():
+                print("BROWSER_POOL browser disconnected, relaunching")
+                await self._retire(slot)
+        active = [slot for slot in self._slots if not slot.retiring]
+        reusable = [
+            (holder.open_pages, slot.open_pages, index, slot, holder)
+            for index, slot in enumerate(active)
+            for holder in slot.contexts
+            if holder.storage_state == storage_state
+            and holder.open_pages < self.pages_per_context
+        ]
+        if reusable:
+            *_, slot, holder = min(reusable, key=lambda item: item[:3])
+            return slot, holder
+        roomy = [slot for slot in active if len(slot.contexts) < self.max_contexts]
+        if roomy:
+            slot = min(roomy, key=lambda item: item.open_pages)
+            return slot, await self._new_context(slot, storage_state)
+        if len(active) < self.size:
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+            slot = _AsyncSlot(browser=browser)
+            self._slots.append(slot)
+            self.launches += 1
+            return slot, await self._new_context(slot, storage_state)
+        return None
+
+    @asynccontextmanager
+    async def page(self, storage_state: str | None = None) -> AsyncIterator[Any]:
+        if self._playwright is None:
+            await self.start()
+        storage_state = storage_state or self.storage_state
+        async with self._condition:
+            picked = await self._pick(storage_state)
+            while picked is None:
+                await self._condition.wait()
+                picked = await self._pick(storage_state)
+            slot, holder = picked
+            slot.uses += 1
+            slot.open_pages += 1
+            holder.open_pages += 1
+            self.pages_served += 1
+            if slot.uses >= self.max_uses:
+                slot.retiring = True
+        page = None
+        try:
+            page = await holder.context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            async with self._condition:
+                holder.open_pages -= 1
+                slot.open_pages -= 1
+                if slot.retiring and slot.open_pages == 0:
+                    print(f"BROWSER_POOL recycle after {slot.uses} pages")
+                    await self._retire(slot)
+                self._condition.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "browsers": len(self._slots),
+            "contexts": sum(len(slot.contexts) for slot in self._slots),
+            "open_pages": sum(slot.open_pages for slot in self._slots),
+            "launches": self.launches,
+            "pages_served": self.pages_served,
+        }
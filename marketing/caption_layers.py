@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+CAPTION_CACHE_DIR = CACHE_DIR / "caption_layers"
+
+
+@dataclass
+class CaptionLayer:
+    path: Path
+    width: int
+    height: int
+    border: int
+
+
+def _parse_box_color(value: str) -> tuple[int, int, int, int]:
+    """ffmpeg 형식("black@0.55")의 색상을 RGBA로 바꿉니다."""
+    name, _, alpha = value.partition("@")
+    red, green, blue = ImageColor.getrgb(name or "black")[:3]
+    opacity = float(alpha) if alpha else 1.0
+    return red, green, blue, int(round(max(0.0, min(1.0, opacity)) * 255))
+
+
+def _load_font(font_path: str | None, font_size: int):
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, font_size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _font_key(font_path: str | None) -> dict:
+    if not font_path:
+        return {"font": None}
+    try:
+        stat = os.stat(font_path)
+    except OSError:
+        return {"font": font_path}
+    return {"font": font_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def render_caption_layer(
+    text: str,
+    font_path: str | None,
+    font_size: int,
+    box_color: str,
+    font_color: str = "white",
+    border: int = 12,
+    line_spacing: int = 6,
+) -> CaptionLayer:
+    """자막 블록을 박스 포함 투명 PNG로 한 번만 래스터화하고 캐시합니다."""
+    key_payload = {
+        "text": text,
+        "font_size": font_size,
+        "box_color": box_color,
+        "font_color": font_color,
+        "border": border,
+        "line_spacing": line_spacing,
+        **_font_key(font_path),
+    }
+    digest = hashlib.sha1(
+        json.dumps(key_payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    layer_path = CAPTION_CACHE_DIR / f"{digest}.png"
+    if layer_path.exists():
+        try:
+            with Image.open(layer_path) as cached:
+                width, height = cached.size
+            return CaptionLayer(layer_path, width, height, border)
+        except OSError:
+            pass
+
+    font = _load_font(font_path, font_size)
+    probe = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = probe.multiline_textbbox(
+        (0, 0), text, font=font, spacing=line_spacing
+    )
+    width = max(1, right - left) + border * 2
+    height = max(1, bottom - top) + border * 2
+
+    image = Image.new("RGBA", (width, height), _parse_box_color(box_color))
+    draw = ImageDraw.Draw(image)
+    draw.multiline_text(
+        (border - left, border - top),
+        text,
+        font=font,
+        fill=ImageColor.getrgb(font_color),
+        spacing=line_spacing,
+    )
+
+    CAPTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = layer_path.with_name(
+        f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+    )
+    image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, layer_path)
+    return CaptionLayer(layer_path, width, height, border)
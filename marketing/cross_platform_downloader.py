@@ -1,16 +1,18 @@
 import os
 import re
 import time
-import subprocess
 from urllib.parse import quote
 from pathlib import Path
 
-import requests
 from deep_translator import GoogleTranslator
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+import blob_store
+import http_client
 from db_manager import DatabaseManager
+from ffmpeg_progress import run_ffmpeg
+from hls_fetcher import fetch_hls
 from storage_paths import RAW_DIR, ensure_storage_dirs
 
 
@@ -36,27 +38,22 @@ def _resolve_target_path(title: str) -> Path:
 
 
 def _download_file(url: str, target_path: Path, referer: str | None = None) -> None:
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-    if referer:
-        headers["Referer"] = referer
-    with requests.get(url, headers=headers, stream=True, timeout=30) as response:
-        response.raise_for_status()
-        with open(target_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
+    blob_store.download(url, target_path, referer=referer, timeout=30)
 
 
 def _download_hls(url: str, target_path: Path, referer: str | None = None) -> bool:
+    try:
+        if fetch_hls(url, target_path, referer=referer):
+            return True
+    except Exception as exc:
+        print(f"HLS_NATIVE_FAILED {url}: {exc}")
     try:
         cmd = ["ffmpeg", "-y"]
         if referer:
             cmd += ["-headers", f"Referer: {referer}\r\n"]
-        result = subprocess.run(
+        result = run_ffmpeg(
             cmd + ["-i", url, "-c", "copy", str(target_path)],
-            capture_output=True,
-            text=True,
-            check=False,
+            job_id=f"hls_{target_path.stem}",
         )
         return result.returncode == 0 and target_path.exists()
     except FileNotFoundError:
@@ -74,13 +71,7 @@ def translate_to_chinese(text: str) -> str:
 
 
 def extract_aliexpress_title(origin_url: str) -> str:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-        "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-    }
-    response = requests.get(origin_url, headers=headers, timeout=30)
-    response.raise_for_status()
-    html = response.text
+    html = http_client.fetch_text(origin_url, timeout=30)
     og_match = re.search(
         r'<meta[^>]+property="og:title"[^>]+content="([^"]+)"',
         html,
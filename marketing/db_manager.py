@@ -1,19 +1,32 @@
 import os
-from typing import Iterable
+import uuid
+from typing import Iterable, Iterator
 from urllib.parse import quote_plus
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, select, update
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import (
+    case,
+    cast,
+    create_engine,
+    func,
+    literal,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import UUID, insert
 from sqlalchemy.orm import Session, sessionmaker
 
 from models import (
     AffiliateLink,
+    Channel,
     PipelineStatus,
     Product,
     UploadLog,
     UploadStatus,
     VideoAsset,
+    VideoFingerprint,
 )
 
 
@@ -176,6 +189,109 @@ class DatabaseManager:
                 select(Product).where(Product.status == status)
             ).all()
 
+    def iter_products_for_render(
+        self,
+        status: str = "DOWNLOADED",
+        track: str | None = None,
+        product_ids: Iterable[str] | None = None,
+        limit: int | None = None,
+        default_channel_id: str | None = None,
+        page_size: int = 200,
+    ) -> Iterator[tuple[Product, uuid.UUID | str | None, Channel | None]]:
+        """렌더 대상 상품을 최신 VideoAsset 채널과 함께 키셋 페이지 단위로 돌려줍니다.
+
+        정렬은 MANUAL 우선, 그다음 id 순이며 필터/정렬/limit/조인이 모두 한 쿼리에서 처리됩니다.
+        """
+        priority = case((Product.track == "MANUAL", 0), else_=1)
+        latest_asset = (
+            select(VideoAsset.channel_id.label("channel_id"))
+            .where(VideoAsset.product_id == Product.id)
+            .order_by(VideoAsset.created_at.desc())
+            .limit(1)
+            .lateral("latest_asset")
+        )
+        channel_id = latest_asset.c.channel_id
+        if default_channel_id:
+            channel_id = func.coalesce(
+                channel_id, cast(literal(default_channel_id), UUID(as_uuid=True))
+            )
+        base = (
+            select(Product, channel_id.label("channel_id"), Channel, priority)
+            .select_from(Product)
+            .outerjoin(latest_asset, true())
+            .outerjoin(Channel, Channel.id == channel_id)
+            .where(Product.status == status)
+        )
+        if track:
+            base = base.where(Product.track == track)
+        if product_ids:
+            ids: list[uuid.UUID] = []
+            for value in product_ids:
+                try:
+                    ids.append(uuid.UUID(str(value)))
+                except ValueError:
+                    continue
+            if not ids:
+                return
+            base = base.where(Product.id.in_(ids))
+
+        remaining = limit
+        last_key: tuple[int, uuid.UUID] | None = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            stmt = base
+            if last_key is not None:
+                stmt = stmt.where(tuple_(priority, Product.id) > tuple_(*last_key))
+            stmt = stmt.order_by(priority, Product.id).limit(size)
+            with self._session() as session:
+                rows = session.execute(stmt).all()
+            if not rows:
+                return
+            for product, row_channel_id, channel, row_priority in rows:
+                yield product, row_channel_id, channel
+                last_key = (row_priority, product.id)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+
+    def get_active_channels(self) -> Iterable[Channel]:
+        with self._session() as session:
+            return session.scalars(
+                select(Channel)
+                .where(Channel.active_yn.is_(True))
+                .order_by(Channel.created_at.asc())
+            ).all()
+
+    def add_video_fingerprint(
+        self,
+        frame_hashes: list[int],
+        product_id=None,
+        source_url: str | None = None,
+        content_sha256: str | None = None,
+    ) -> VideoFingerprint:
+        with self._session() as session:
+            fingerprint = VideoFingerprint(
+                product_id=product_id,
+                source_url=source_url,
+                content_sha256=content_sha256,
+                frame_hashes=frame_hashes,
+            )
+            session.add(fingerprint)
+            session.commit()
+            session.refresh(fingerprint)
+            return fingerprint
+
+    def get_video_fingerprints(self, since=None) -> Iterable[VideoFingerprint]:
+        with self._session() as session:
+            stmt = select(VideoFingerprint).order_by(
+                VideoFingerprint.created_at.asc(), VideoFingerprint.id.asc()
+            )
+            if since is not None:
+                # 경계 시각과 같은 행도 포함합니다. 중복은 호출 쪽에서 id로 거릅니다.
+                stmt = stmt.where(VideoFingerprint.created_at >= since)
+            return session.scalars(stmt).all()
+
     def get_products_by_status_and_track(
         self, status: str, track: str
     ) -> Iterable[Product]:
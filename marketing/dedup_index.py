@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from media_probe import probe_media
+
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 중복 검사를 건너뜁니다.
+    np = None
+
+
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+DEFAULT_FRAMES = 8
+DEFAULT_MAX_DISTANCE = 10
+DEFAULT_MIN_MATCH = 0.75
+# 단색 화면(검은 인트로 등)은 dHash가 0/전부 1이 되어 아무 영상과도 겹치므로 제외합니다.
+_FLAT_HASHES = (0, 0xFFFFFFFFFFFFFFFF)
+_CHUNK_ROWS = 20000
+# created_at은 각 프로세스 시계로 찍히므로 마지막 시각보다 이만큼 앞에서부터 다시 읽습니다.
+DEFAULT_REFRESH_OVERLAP_SEC = 300
+
+
+@dataclass
+class NearDuplicate:
+    product_id: str | None
+    source_url: str | None
+    match_ratio: float
+    mean_distance: float
+
+
+def _env_number(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key) or default)
+    except ValueError:
+        return default
+
+
+def is_enabled() -> bool:
+    return np is not None and os.getenv("NEAR_DUP_CHECK") != "0"
+
+
+def _frame_count() -> int:
+    return max(1, int(_env_number("NEAR_DUP_FRAMES", DEFAULT_FRAMES)))
+
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    as_bytes = np.ascontiguousarray(values).view(np.uint8)
+    return table[as_bytes].reshape(*values.shape, 8).sum(axis=-1)
+
+
+def _sample_frames(path: Path, count: int):
+    """ffmpeg로 균등 간격 프레임을 9x8 회색조로 줄여 (N, 8, 9) 배열로 읽습니다."""
+    info = probe_media(path)
+    if info is None or not info.has_video or info.duration <= 0:
+        return None
+    rate = count / info.duration
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-nostdin",
+        "-i",
+        str(path),
+        "-vf",
+        f"fps={rate:.6f},scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=area,format=gray",
+        "-frames:v",
+        str(count),
+        "-f",
+        "rawvideo",
+        "pipe:1",
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=False, timeout=120)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    frame_size = HASH_WIDTH * HASH_HEIGHT
+    usable = len(result.stdout) // frame_size * frame_size
+    if result.returncode != 0 or usable == 0:
+        return None
+    frames = np.frombuffer(result.stdout[:usable], dtype=np.uint8)
+    return frames.reshape(-1, HASH_HEIGHT, HASH_WIDTH)
+
+
+def _dhash(frames):
+    # 가로로 이웃한 픽셀의 밝기 증감 64비트를 프레임마다 한 번에 계산합니다.
+    bits = frames[:, :, 1:] > frames[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(frames), 64), axis=1)
+    return packed.view(">u8").reshape(-1).astype(np.uint64)
+
+
+def _unsigned(values: list[int]):
+    return np.array(values, dtype=np.int64).view(np.uint64)
+
+
+def _fit(hashes, count: int):
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if len(hashes) >= count:
+        return hashes[:count]
+    return np.concatenate([hashes, np.repeat(hashes[-1:], count - len(hashes))])
+
+
+def fingerprint_video(path: Path) -> list[int] | None:
+    """샘플 프레임 dHash 목록. DB(BIGINT[])에 넣을 수 있게 부호 있는 정수로 반환합니다."""
+    if not is_enabled():
+        return None
+    count = _frame_count()
+    frames = _sample_frames(path, count)
+    if frames is None:
+        return None
+    hashes = _fit(_dhash(frames), count)
+    return hashes.view(np.int64).tolist()
+
+
+class FingerprintIndex:
+    """DB의 지문을 메모리 행렬로 들고 있으면서 해밍 거리로 근접 중복을 찾습니다."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._meta: list[tuple[str | None, str | None]] = []
+        self._ids: set[str] = set()
+        self._loaded_until = None
+
+    def refresh(self, manager) -> None:
+        with self._lock:
+            since = self._loaded_until
+            if since is not None:
+                overlap = _env_number(
+                    "NEAR_DUP_REFRESH_OVERLAP_SEC", DEFAULT_REFRESH_OVERLAP_SEC
+                )
+                since -= timedelta(seconds=overlap)
+            # 시계가 조금 늦은 다른 프로세스의 행이나 같은 시각의 행도 겹치는 구간에서
+            # 다시 읽히고, 이미 올린 행은 id로 걸러냅니다.
+            rows = [
+                row
+                for row in manager.get_video_fingerprints(since=since)
+                if str(row.id) not in self._ids
+            ]
+            if not rows:
+                return
+            latest = max(row.created_at for row in rows)
+            if self._loaded_until is None or latest > self._loaded_until:
+                self._loaded_until = latest
+            self._ids.update(str(row.id) for row in rows)
+            rows = [row for row in rows if row.frame_hashes]
+            if not rows:
+                return
+            count = _frame_count()
+            block = np.stack([_fit(_unsigned(row.frame_hashes), count) for row in rows])
+            if self._matrix is None:
+                self._matrix = block
+            else:
+                self._matrix = np.concatenate([self._matrix, block])
+            self._meta.extend(
+                (str(row.product_id) if row.product_id else None, row.source_url)
+                for row in rows
+            )
+
+    def find(
+        self, frame_hashes: list[int], exclude_product_id=None
+    ) -> NearDuplicate | None:
+        if self._matrix is None or not frame_hashes:
+            return None
+        query = _unsigned(frame_hashes)
+        informative = ~np.isin(query, np.array(_FLAT_HASHES, dtype=np.uint64))
+        if informative.sum() < 3:
+            return None
+        query = query[informative]
+        max_distance = _env_number("NEAR_DUP_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)
+        min_match = _env_number("NEAR_DUP_MIN_MATCH", DEFAULT_MIN_MATCH)
+        with self._lock:
+            matrix = self._matrix
+            meta = list(self._meta)
+        # (후보, 질의 프레임, 후보 프레임) 거리 중 후보 프레임 축의 최솟값을 씁니다.
+        # 재인코딩/앞뒤 잘림으로 샘플 위치가 조금 어긋나도 매칭됩니다.
+        chunks = np.array_split(matrix, max(1, len(matrix) // _CHUNK_ROWS))
+        distances = np.concatenate(
+            [
+                _popcount(chunk[:, None, :] ^ query[None, :, None]).min(axis=2)
+                for chunk in chunks
+            ]
+        )
+        ratios = (distances <= max_distance).mean(axis=1)
+        means = distances.mean(axis=1)
+        order = np.lexsort((means, -ratios))
+        exclude = str(exclude_product_id) if exclude_product_id else None
+        for index in order:
+            if ratios[index] < min_match:
+                break
+            product_id, source_url = meta[index]
+            if exclude and product_id == exclude:
+                continue
+            return NearDuplicate(
+                product_id=product_id,
+                source_url=source_url,
+                match_ratio=float(ratios[index]),
+                mean_distance=float(means[index]),
+            )
+        return None
+
+
+_default_index: FingerprintIndex | None = None
+
+
+def get_index() -> FingerprintIndex:
+    global _default_index
+    if _default_index is None:
+        _default_index = FingerprintIndex()
+    return _default_index
+
+
+def check_and_register(
+    manager,
+    product,
+    raw_path: Path,
+    frame_hashes: list[int] | None,
+    content_sha256: str | None = None,
+) -> NearDuplicate | None:
+    """근접 중복이면 그 정보를 반환하고, 아니면 지문을 DB와 인덱스에 등록합니다."""
+    if not frame_hashes or not is_enabled():
+        return None
+    index = get_index()
+    index.refresh(manager)
+    duplicate = index.find(frame_hashes, exclude_product_id=product.id)
+    if duplicate:
+        return duplicate
+    manager.add_video_fingerprint(
+        frame_hashes,
+        product_id=product.id,
+        source_url=product.origin_url,
+        content_sha256=content_sha256,
+    )
+    return None
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterable, Iterator, TypeVar
+from urllib.parse import urlparse
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+# 호스트별 기본 동시 다운로드 수. DOWNLOAD_HOST_LIMITS로 덮어쓸 수 있습니다.
+DEFAULT_HOST_LIMITS = {
+    "aliexpress.com": 2,
+    "tiktok.com": 2,
+    "douyin.com": 1,
+    "dailymotion.com": 2,
+    "youtube.com": 3,
+    "youtu.be": 3,
+    "instagram.com": 1,
+}
+_MULTI_PART_SUFFIXES = ("co.kr", "co.jp", "com.cn", "co.uk", "com.au")
+
+T = TypeVar("T")
+
+
+@dataclass
+class DownloadOutcome(Generic[T]):
+    item: T
+    host: str
+    result: Any
+    error: BaseException | None
+
+
+def host_key(url: str | None) -> str:
+    """www./m. 같은 서브도메인을 떼고 등록 도메인 단위로 묶습니다."""
+    netloc = (urlparse(url or "").hostname or "").lower()
+    if not netloc:
+        return ""
+    for known in DEFAULT_HOST_LIMITS:
+        if netloc == known or netloc.endswith(f".{known}"):
+            return known
+    parts = netloc.split(".")
+    keep = 3 if ".".join(parts[-2:]) in _MULTI_PART_SUFFIXES else 2
+    return ".".join(parts[-keep:])
+
+
+def parse_host_limits(raw: str | None) -> dict[str, int]:
+    limits: dict[str, int] = {}
+    for part in (raw or "").split(","):
+        host, sep, value = part.partition("=")
+        if not sep:
+            continue
+        try:
+            limits[host.strip().lower()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+def resolve_download_workers(workers: int | None = None) -> int:
+    if workers is None:
+        try:
+            workers = int(os.getenv("DOWNLOAD_CONCURRENCY") or DEFAULT_WORKERS)
+        except ValueError:
+            workers = DEFAULT_WORKERS
+    return max(1, workers)
+
+
+class DownloadPool:
+    """전체 동시 실행 수와 호스트별 동시 실행 수를 함께 제한하는 다운로드 스케줄러.
+
+    호스트 한도에 걸린 작업은 스레드를 점유하지 않고 대기열에 남아 있다가
+    같은 호스트의 작업이 끝나면 제출됩니다.
+    """
+
+    def __init__(
+        self,
+        download_fn: Callable[[T], Any],
+        url_fn: Callable[[T], str | None],
+        workers: int | None = None,
+        host_limits: dict[str, int] | None = None,
+        per_host: int | None = None,
+    ) -> None:
+        self.download_fn = download_fn
+        self.url_fn = url_fn
+        self.workers = resolve_download_workers(workers)
+        limits = dict(DEFAULT_HOST_LIMITS)
+        limits.update(parse_host_limits(os.getenv("DOWNLOAD_HOST_LIMITS")))
+        limits.update(host_limits or {})
+        self.host_limits = limits
+        if per_host is None:
+            try:
+                per_host = int(os.getenv("DOWNLOAD_PER_HOST") or DEFAULT_PER_HOST)
+            except ValueError:
+                per_host = DEFAULT_PER_HOST
+        self.per_host = max(1, per_host)
+
+    def _limit_for(self, host: str) -> int:
+        return self.host_limits.get(host, self.per_host)
+
+    def imap(self, items: Iterable[T]) -> Iterator[DownloadOutcome[T]]:
+        """끝나는 순서대로 결과를 yield 합니다."""
+        waiting: deque[tuple[str, T]] = deque(
+            (host_key(self.url_fn(item)), item) for item in items
+        )
+        active: dict[str, int] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="download"
+        ) as executor:
+            pending: dict[Future, tuple[str, T]] = {}
+
+            def _fill() -> None:
+                skipped: deque[tuple[str, T]] = deque()
+                while waiting and len(pending) < self.workers:
+                    host, item = waiting.popleft()
+                    if active.get(host, 0) >= self._limit_for(host):
+                        skipped.append((host, item))
+                        continue
+                    active[host] = active.get(host, 0) + 1
+                    pending[executor.submit(self.download_fn, item)] = (host, item)
+                # 건너뛴 작업은 원래 순서를 유지한 채 대기열 앞에 되돌립니다.
+                waiting.extendleft(reversed(skipped))
+
+            _fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, item = pending.pop(future)
+                    active[host] -= 1
+                    error = future.exception()
+                    yield DownloadOutcome(
+                        item=item,
+                        host=host,
+                        result=None if error else future.result(),
+                        error=error,
+                    )
+                _fill()
@@ -1,24 +1,46 @@
 import json
+import os
 import random
 import re
+import threading
 import time
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
-import requests
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-from playwright.sync_api import sync_playwright
 from playwright_stealth.stealth import Stealth
 
+import blob_store
+import dedup_index
+import http_client
+import mp4_probe
+from browser_pool import BrowserPool
 from db_manager import DatabaseManager
+from ffmpeg_progress import run_ffmpeg
+from hls_fetcher import fetch_hls
+from render_cache import content_hash
 from storage_paths import RAW_DIR, ensure_storage_dirs
 
 
 ensure_storage_dirs()
 NETWORK_DUMP = Path("network_dump.txt")
 NETWORK_DUMP.parent.mkdir(parents=True, exist_ok=True)
+PAGE_JSON_KEYS = ("_runData_", "runParams", "__AER_DATA__", "__RUNTIME_CONFIG__")
+REVIEW_SELECTORS = ["text=Reviews", "text=Review", "text=후기", "text=리뷰"]
+REVIEW_VIDEO_SELECTORS = [
+    "video",
+    "[data-video]",
+    "img[src*='video']",
+    "img[src*='mp4']",
+]
+VIDEO_SRC_JS = (
+    "nodes => nodes.map(node => node.currentSrc || node.src).filter(Boolean)"
+)
+SOURCE_SRC_JS = "nodes => nodes.map(node => node.src).filter(Boolean)"
+PERF_URLS_JS = "() => performance.getEntriesByType('resource').map(e => e.name)"
+_reserve_lock = threading.Lock()
+_reserved_paths: set[Path] = set()
 
 
 @dataclass
@@ -35,53 +57,59 @@ def _sanitize_title(title: str) -> str:
     return sanitized or "상품"
 
 
-def _resolve_target_path(title: str) -> Path:
+def resolve_target_path(title: str) -> Path:
     base_name = f"{_sanitize_title(title).replace(' ', '_')}.mp4"
     target_path = RAW_DIR / base_name
-    if not target_path.exists():
-        return target_path
-    stem = target_path.stem
-    for index in range(2, 50):
-        candidate = RAW_DIR / f"{stem}_{index}.mp4"
-        if not candidate.exists():
-            return candidate
+    # 동시에 받는 같은 제목의 상품이 같은 파일명을 고르지 않도록 예약해 둡니다.
+    with _reserve_lock:
+        if not target_path.exists() and target_path not in _reserved_paths:
+            _reserved_paths.add(target_path)
+            return target_path
+        stem = target_path.stem
+        for index in range(2, 50):
+            candidate = RAW_DIR / f"{stem}_{index}.mp4"
+            if not candidate.exists() and candidate not in _reserved_paths:
+                _reserved_paths.add(candidate)
+                return candidate
     return target_path
 
 
+def release_target_path(target_path: Path) -> None:
+    # 파일이 생겼으면 exists()가 이름을 지키므로 예약은 다운로드가 끝나면 풉니다.
+    with _reserve_lock:
+        _reserved_paths.discard(target_path)
+
+
 def _download_file(url: str, target_path: Path) -> None:
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-    with requests.get(url, headers=headers, stream=True, timeout=30) as response:
-        response.raise_for_status()
-        with open(target_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
+    blob_store.download(
+        url, target_path, timeout=30, make_inspector=mp4_probe.stream_inspector
+    )
 
 
-def _normalize_mobile_url(url: str) -> str:
+def normalize_mobile_url(url: str) -> str:
     if "aliexpress.com" in url and "m.aliexpress.com" not in url:
         return re.sub(r"^https?://(www\.)?aliexpress\.com", "https://m.aliexpress.com", url)
     return url
 
 
-def _find_video_urls_in_json(payload: object) -> list[str]:
+def find_video_urls_in_json(payload: object) -> list[str]:
     found: list[str] = []
     if isinstance(payload, dict):
         for key, value in payload.items():
             if isinstance(key, str) and "video" in key.lower() and isinstance(value, str):
                 if value.startswith("http"):
                     found.append(value)
-            found.extend(_find_video_urls_in_json(value))
+            found.extend(find_video_urls_in_json(value))
     elif isinstance(payload, list):
         for item in payload:
-            found.extend(_find_video_urls_in_json(item))
+            found.extend(find_video_urls_in_json(item))
     elif isinstance(payload, str):
         if payload.startswith("http") and (".mp4" in payload or ".m3u8" in payload):
             found.append(payload)
     return found
 
 
-def _append_network_dump(url: str, content_type: str) -> None:
+def append_network_dump(url: str, content_type: str) -> None:
     try:
         with NETWORK_DUMP.open("a", encoding="utf-8") as handle:
             handle.write(f"{url}\n{content_type}\n\n")
@@ -93,45 +121,61 @@ def _extract_mp4_from_text(text: str) -> list[str]:
     return re.findall(r"https?://[^\\\"'\\s]+\\.mp4", text)
 
 
+def is_video_response(url: str, content_type: str, resource_type: str) -> bool:
+    if resource_type == "media":
+        return True
+    return ".mp4" in url or ".m3u8" in url or "video/mp4" in content_type
+
+
+def wants_body(url: str, content_type: str) -> bool:
+    if "mtop" in url:
+        return True
+    return "application/json" in content_type or "text/json" in content_type
+
+
+def sources_from_body(text: str) -> list[str]:
+    found = _extract_mp4_from_text(text)
+    try:
+        data = json.loads(text)
+    except Exception:
+        return found
+    return found + find_video_urls_in_json(data)
+
+
+def sources_from_html(html: str) -> list[str]:
+    return re.findall(r"https?://[^\\\"'\\s]+\\.(?:mp4|m3u8)", html)
+
+
 def _extract_video_sources(
-    page_url: str, storage_state: str | None = None
+    page_url: str,
+    storage_state: str | None = None,
+    pool: BrowserPool | None = None,
 ) -> list[str]:
+    if pool is None:
+        with BrowserPool(storage_state=storage_state, size=1) as own_pool:
+            return _extract_video_sources(page_url, storage_state, own_pool)
     sources: list[str] = []
     response_sources: list[str] = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        iphone = p.devices.get("iPhone 14 Pro") or {}
-        context = browser.new_context(
-            **iphone,
-            locale="ko-KR",
-            storage_state=storage_state or None,
-        )
-        page = context.new_page()
+    # 브라우저/컨텍스트는 풀에서 재사용하고 상품마다 페이지만 새로 엽니다.
+    with pool.page(storage_state) as page:
         Stealth().apply_stealth_sync(page)
 
         def handle_response(response):
             url = response.url
             content_type = response.headers.get("content-type", "")
-            _append_network_dump(url, content_type)
-            if response.request.resource_type == "media":
+            append_network_dump(url, content_type)
+            if is_video_response(url, content_type, response.request.resource_type):
                 response_sources.append(url)
                 return
-            if ".mp4" in url or ".m3u8" in url or "video/mp4" in content_type:
-                response_sources.append(url)
-                return
-            if "mtop" in url or "application/json" in content_type or "text/json" in content_type:
+            if wants_body(url, content_type):
                 try:
                     text = response.text()
-                    for found in _extract_mp4_from_text(text):
-                        response_sources.append(found)
-                    data = json.loads(text)
                 except Exception:
                     return
-                for found in _find_video_urls_in_json(data):
-                    response_sources.append(found)
+                response_sources.extend(sources_from_body(text))
 
         page.on("response", handle_response)
-        mobile_url = _normalize_mobile_url(page_url)
+        mobile_url = normalize_mobile_url(page_url)
         page.goto(mobile_url, wait_until="domcontentloaded", timeout=60000)
         page.wait_for_timeout(10000)
         time.sleep(random.uniform(2.5, 4.0))
@@ -164,13 +208,7 @@ def _extract_video_sources(
 
         # Try to open review media section and click a review video thumbnail.
         try:
-            review_selectors = [
-                "text=Reviews",
-                "text=Review",
-                "text=후기",
-                "text=리뷰",
-            ]
-            for selector in review_selectors:
+            for selector in REVIEW_SELECTORS:
                 if page.locator(selector).first.is_visible():
                     page.locator(selector).first.click()
                     time.sleep(random.uniform(2.0, 3.0))
@@ -179,13 +217,7 @@ def _extract_video_sources(
             pass
 
         try:
-            review_video_selectors = [
-                "video",
-                "[data-video]",
-                "img[src*='video']",
-                "img[src*='mp4']",
-            ]
-            for selector in review_video_selectors:
+            for selector in REVIEW_VIDEO_SELECTORS:
                 locator = page.locator(selector)
                 if locator.count() > 0:
                     locator.first.click()
@@ -201,17 +233,11 @@ def _extract_video_sources(
                 break
             time.sleep(1.0)
 
-        video_srcs = page.eval_on_selector_all(
-            "video",
-            "nodes => nodes.map(node => node.currentSrc || node.src).filter(Boolean)",
-        )
-        source_srcs = page.eval_on_selector_all(
-            "video source",
-            "nodes => nodes.map(node => node.src).filter(Boolean)",
-        )
+        video_srcs = page.eval_on_selector_all("video", VIDEO_SRC_JS)
+        source_srcs = page.eval_on_selector_all("video source", SOURCE_SRC_JS)
         # Try extracting from page-side JSON blobs if present.
         json_candidates = []
-        for key in ("_runData_", "runParams", "__AER_DATA__", "__RUNTIME_CONFIG__"):
+        for key in PAGE_JSON_KEYS:
             try:
                 data = page.evaluate(f"() => window.{key} || null")
                 if data:
@@ -219,13 +245,11 @@ def _extract_video_sources(
             except Exception:
                 continue
         for data in json_candidates:
-            response_sources.extend(_find_video_urls_in_json(data))
+            response_sources.extend(find_video_urls_in_json(data))
 
         # Look for video URLs inside performance entries (including blob/HLS).
         try:
-            perf_urls = page.evaluate(
-                "() => performance.getEntriesByType('resource').map(e => e.name)"
-            )
+            perf_urls = page.evaluate(PERF_URLS_JS)
             for url in perf_urls:
                 if ".mp4" in url or ".m3u8" in url:
                     response_sources.append(url)
@@ -234,63 +258,74 @@ def _extract_video_sources(
 
         # Scan raw HTML for video URL fragments.
         try:
-            html = page.content()
-            for match in re.findall(r"https?://[^\\\"'\\s]+\\.(?:mp4|m3u8)", html):
-                response_sources.append(match)
+            response_sources.extend(sources_from_html(page.content()))
         except Exception:
             pass
 
         sources = list(dict.fromkeys(video_srcs + source_srcs + response_sources))
-        context.close()
-        browser.close()
     return sources
 
 
 def _download_hls(url: str, target_path: Path) -> bool:
     try:
-        result = subprocess.run(
-            [
-                "ffmpeg",
-                "-y",
-                "-i",
-                url,
-                "-c",
-                "copy",
-                str(target_path),
-            ],
-            capture_output=True,
-            text=True,
-            check=False,
+        if fetch_hls(url, target_path):
+            return True
+    except Exception as exc:
+        print(f"HLS_NATIVE_FAILED {url}: {exc}")
+    try:
+        result = run_ffmpeg(
+            ["ffmpeg", "-y", "-i", url, "-c", "copy", str(target_path)],
+            job_id=f"hls_{target_path.stem}",
         )
         return result.returncode == 0 and target_path.exists()
     except FileNotFoundError:
         return False
 
 
-def download_for_product(product, storage_state: str | None = None) -> Path | None:
-    target_path = _resolve_target_path(product.title or "상품")
-    sources = _extract_video_sources(product.origin_url, storage_state)
-    for src in sources:
-        print(f"FOUND_VIDEO_URL {product.origin_url} -> {src}")
-        try:
-            if ".m3u8" in src:
-                if _download_hls(src, target_path):
-                    return target_path
-                continue
-            if src.startswith("blob:"):
-                continue
-            _download_file(src, target_path)
-            if target_path.exists() and target_path.stat().st_size > 1024:
+def download_for_product(
+    product, storage_state: str | None = None, pool: BrowserPool | None = None
+) -> Path | None:
+    target_path = resolve_target_path(product.title or "상품")
+    try:
+        sources = _extract_video_sources(product.origin_url, storage_state, pool)
+        for src in sources:
+            print(f"FOUND_VIDEO_URL {product.origin_url} -> {src}")
+            if download_source(src, target_path):
                 return target_path
-        except Exception:
-            continue
-    return None
+        return None
+    finally:
+        release_target_path(target_path)
+
+
+def download_source(src: str, target_path: Path) -> bool:
+    try:
+        if ".m3u8" in src:
+            return _download_hls(src, target_path)
+        if src.startswith("blob:"):
+            return False
+        _download_file(src, target_path)
+        if mp4_probe.is_valid_video(target_path):
+            return True
+        blob_store.release(target_path)
+    except Exception:
+        pass
+    return False
+
+
+def _resolve_concurrency(concurrency: int | None) -> int:
+    if concurrency is None:
+        try:
+            concurrency = int(os.getenv("EXTRACT_CONCURRENCY") or 1)
+        except ValueError:
+            concurrency = 1
+    return max(1, concurrency)
 
 
 def download_ready_products(
     limit: int | None = None,
     storage_state: str | None = None,
     origin_urls: list[str] | None = None,
+    concurrency: int | None = None,
 ) -> Iterable[DownloadResult]:
     manager = DatabaseManager()
     priority_products = manager.get_products_by_status("PRIORITY_DOWNLOAD")
@@ -302,33 +337,81 @@ def download_ready_products(
     if limit is not None:
         products = products[:limit]
 
-    results: list[DownloadResult] = []
-    for product in products:
-        raw_path = download_for_product(product, storage_state)
-        if raw_path:
-            manager.update_product_status_by_id(product.id, "DOWNLOADED")
-            results.append(
-                DownloadResult(
-                    product_id=str(product.id),
-                    origin_url=product.origin_url,
-                    raw_path=raw_path,
-                    success=True,
-                    message="downloaded",
-                )
-            )
-        else:
-            results.append(
-                DownloadResult(
-                    product_id=str(product.id),
-                    origin_url=product.origin_url,
-                    raw_path=None,
-                    success=False,
-                    message="no video found",
-                )
-            )
+    concurrency = _resolve_concurrency(concurrency)
+    if concurrency > 1:
+        # 여러 탭을 동시에 띄우는 async 경로. 기본값(1)은 기존 순차 경로를 유지합니다.
+        from async_extractor import run_batch
+
+        results = run_batch(manager, products, storage_state, concurrency)
+    else:
+        results = []
+        with BrowserPool(storage_state=storage_state) as pool:
+            for product in products:
+                results.append(_download_one(manager, product, storage_state, pool))
+            print(f"BROWSER_POOL {pool.stats()}")
+    print(f"HTTP_METRICS {http_client.metrics()}")
     return results
 
 
+def _download_one(
+    manager, product, storage_state: str | None, pool: BrowserPool
+) -> DownloadResult:
+    try:
+        raw_path = download_for_product(product, storage_state, pool)
+    except Exception as exc:
+        # 브라우저/풀 오류는 영상이 없는 페이지와 구분되게 따로 보고합니다.
+        print(f"EXTRACT_FAILED {product.origin_url}: {exc}")
+        return DownloadResult(
+            product_id=str(product.id),
+            origin_url=product.origin_url,
+            raw_path=None,
+            success=False,
+            message=f"error: {exc}",
+        )
+    frame_hashes = dedup_index.fingerprint_video(raw_path) if raw_path else None
+    return record_result(manager, product, raw_path, frame_hashes)
+
+
+def record_result(
+    manager, product, raw_path: Path | None, frame_hashes: list[int] | None
+) -> DownloadResult:
+    duplicate = None
+    if raw_path:
+        duplicate = dedup_index.check_and_register(
+            manager, product, raw_path, frame_hashes, content_hash(raw_path)
+        )
+    if duplicate:
+        manager.update_product_status_by_id(product.id, "DUPLICATE")
+        blob_store.release(raw_path)
+        return DownloadResult(
+            product_id=str(product.id),
+            origin_url=product.origin_url,
+            raw_path=None,
+            success=False,
+            message=(
+                f"near duplicate of {duplicate.product_id or duplicate.source_url} "
+                f"(match={duplicate.match_ratio:.2f}, "
+                f"dist={duplicate.mean_distance:.1f})"
+            ),
+        )
+    if raw_path:
+        manager.update_product_status_by_id(product.id, "DOWNLOADED")
+        return DownloadResult(
+            product_id=str(product.id),
+            origin_url=product.origin_url,
+            raw_path=raw_path,
+            success=True,
+            message="downloaded",
+        )
+    return DownloadResult(
+        product_id=str(product.id),
+        origin_url=product.origin_url,
+        raw_path=None,
+        success=False,
+        message="no video found",
+    )
+
+
 def main() -> None:
     import argparse
 
@@ -336,10 +419,16 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=None)
     parser.add_argument("--storage-state", dest="storage_state")
     parser.add_argument("--urls", nargs="*", help="Target origin URLs")
+    parser.add_argument(
+        "--concurrency", type=int, default=None, help="동시에 여는 상품 페이지 수"
+    )
     args = parser.parse_args()
 
     results = download_ready_products(
-        limit=args.limit, storage_state=args.storage_state, origin_urls=args.urls
+        limit=args.limit,
+        storage_state=args.storage_state,
+        origin_urls=args.urls,
+        concurrency=args.concurrency,
     )
     for result in results:
         if result.success:
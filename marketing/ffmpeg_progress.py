@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from storage_paths import LOGS_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+PROGRESS_DIR = LOGS_DIR / "ffmpeg_progress"
+_STDERR_TAIL_LINES = 200
+
+
+@dataclass
+class FFmpegProgress:
+    job_id: str
+    status: str
+    frame: int
+    fps: float
+    speed: float
+    out_time_sec: float
+    total_sec: float | None
+    eta_sec: float | None
+    percent: float | None
+    elapsed_sec: float
+
+
+@dataclass
+class FFmpegRunResult:
+    returncode: int
+    stderr: str
+    last_progress: FFmpegProgress | None
+
+
+ProgressCallback = Callable[[FFmpegProgress], None]
+
+
+def _to_float(value: str | None) -> float:
+    if not value:
+        return 0.0
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+def _out_time_sec(fields: dict[str, str]) -> float:
+    # out_time_us가 정확하지만 일부 빌드는 out_time_ms에 마이크로초를 넣습니다.
+    for key in ("out_time_us", "out_time_ms"):
+        value = fields.get(key)
+        if value and value.lstrip("-").isdigit():
+            return max(0.0, int(value) / 1_000_000)
+    match = re.match(r"(\d+):(\d+):([\d.]+)", fields.get("out_time", ""))
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return 0.0
+
+
+def _build_snapshot(
+    job_id: str,
+    fields: dict[str, str],
+    total_sec: float | None,
+    started: float,
+) -> FFmpegProgress:
+    out_time = _out_time_sec(fields)
+    speed = _to_float(fields.get("speed"))
+    eta = None
+    percent = None
+    if total_sec and total_sec > 0:
+        percent = min(100.0, out_time / total_sec * 100)
+        if speed > 0:
+            eta = max(0.0, (total_sec - out_time) / speed)
+    return FFmpegProgress(
+        job_id=job_id,
+        status=fields.get("progress", "continue"),
+        frame=int(_to_float(fields.get("frame"))),
+        fps=_to_float(fields.get("fps")),
+        speed=speed,
+        out_time_sec=out_time,
+        total_sec=total_sec,
+        eta_sec=eta,
+        percent=percent,
+        elapsed_sec=time.monotonic() - started,
+    )
+
+
+class ProgressRecorder:
+    """잡별 최신 진행 상황을 LOGS_DIR/ffmpeg_progress/<job_id>.json에 기록합니다."""
+
+    def __init__(self, job_id: str, min_interval: float = 1.0) -> None:
+        safe_id = re.sub(r"[^\w.-]", "_", job_id)[:120] or "job"
+        self.path = PROGRESS_DIR / f"{safe_id}.json"
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    def __call__(self, progress: FFmpegProgress) -> None:
+        now = time.monotonic()
+        if progress.status != "end" and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        payload = {**asdict(progress), "updated_at": time.time()}
+        try:
+            PROGRESS_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(
+                f"{self.path.name}.{threading.get_ident()}.tmp"
+            )
+            tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def _with_progress_args(cmd: list[str]) -> list[str]:
+    if not cmd or "-progress" in cmd:
+        return list(cmd)
+    return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+
+def run_ffmpeg(
+    cmd: list[str],
+    job_id: str,
+    total_sec: float | None = None,
+    on_progress: ProgressCallback | None = None,
+    timeout: float | None = None,
+) -> FFmpegRunResult:
+    """ffmpeg를 -progress pipe:1로 실행해 진행 상황을 파싱하고 stderr는 끝부분만 보관합니다."""
+    callbacks: list[ProgressCallback] = [ProgressRecorder(job_id)]
+    if on_progress:
+        callbacks.append(on_progress)
+
+    started = time.monotonic()
+    process = subprocess.Popen(
+        _with_progress_args(cmd),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="ignore",
+    )
+    stderr_tail: deque[str] = deque(maxlen=_STDERR_TAIL_LINES)
+
+    def _drain_stderr() -> None:
+        assert process.stderr is not None
+        for line in process.stderr:
+            stderr_tail.append(line)
+
+    stderr_thread = threading.Thread(target=_drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    timed_out = threading.Event()
+
+    def _kill() -> None:
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, _kill) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+
+    last_progress: FFmpegProgress | None = None
+    fields: dict[str, str] = {}
+    try:
+        assert process.stdout is not None
+        for line in process.stdout:
+            key, sep, value = line.strip().partition("=")
+            if not sep:
+                continue
+            fields[key] = value
+            if key != "progress":
+                continue
+            last_progress = _build_snapshot(job_id, fields, total_sec, started)
+            for callback in callbacks:
+                try:
+                    callback(last_progress)
+                except Exception:
+                    pass
+            fields = {}
+        returncode = process.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_thread.join(timeout=5)
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout or 0, stderr="".join(stderr_tail))
+    return FFmpegRunResult(
+        returncode=returncode,
+        stderr="".join(stderr_tail),
+        last_progress=last_progress,
+    )
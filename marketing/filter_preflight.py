@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from pathlib import Path
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+PREFLIGHT_CACHE_PATH = CACHE_DIR / "filter_preflight.json"
+_SYNTHETIC_SECONDS = 0.2
+_lock = threading.Lock()
+_memory: dict[str, bool] | None = None
+_ffmpeg_version: str | None = None
+
+
+def synthetic_av_input(
+    width: int, height: int, fps: float, with_audio: bool
+) -> list[str]:
+    """실제 원본 대신 쓸 1프레임 분량의 lavfi 입력(필요하면 무음 오디오 포함)."""
+    width = width if width > 0 else 720
+    height = height if height > 0 else 1280
+    rate = f"{fps:.3f}" if fps > 0 else "30"
+    video = (
+        f"color=c=black:s={width}x{height}:r={rate}:d={_SYNTHETIC_SECONDS}"
+    )
+    if with_audio:
+        spec = (
+            f"{video}[out0];"
+            f"anullsrc=r=44100:cl=stereo,atrim=0:{_SYNTHETIC_SECONDS}[out1]"
+        )
+    else:
+        spec = video
+    return ["-f", "lavfi", "-i", spec]
+
+
+def synthetic_audio_input() -> list[str]:
+    return ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo"]
+
+
+def _get_ffmpeg_version() -> str:
+    global _ffmpeg_version
+    if _ffmpeg_version is None:
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-version"],
+                capture_output=True,
+                text=True,
+                errors="ignore",
+                check=False,
+                timeout=10,
+            )
+            lines = (result.stdout or "").splitlines()
+            _ffmpeg_version = lines[0].strip() if lines else ""
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            _ffmpeg_version = ""
+    return _ffmpeg_version
+
+
+def _template_key(filter_complex: str, inputs: list[list[str]]) -> str:
+    # 좌표/시간 같은 숫자만 다른 그래프는 같은 템플릿으로 봅니다.
+    template = re.sub(r"\d+(?:\.\d+)?", "N", filter_complex)
+    kinds = []
+    for args in inputs:
+        if "lavfi" in args:
+            kinds.append(re.sub(r"\d+(?:\.\d+)?", "N", args[-1]))
+        else:
+            kinds.append(Path(args[-1]).suffix.lower())
+    # ffmpeg를 바꾸면 필터 지원 여부가 달라질 수 있으므로 버전도 키에 넣습니다.
+    payload = json.dumps(
+        {"graph": template, "inputs": kinds, "ffmpeg": _get_ffmpeg_version()},
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _load_cache() -> dict[str, bool]:
+    global _memory
+    if _memory is None:
+        try:
+            _memory = json.loads(PREFLIGHT_CACHE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _memory = {}
+    return _memory
+
+
+def _store_pass(key: str) -> None:
+    with _lock:
+        cache = _load_cache()
+        cache[key] = True
+        try:
+            tmp_path = PREFLIGHT_CACHE_PATH.with_name(
+                f"{PREFLIGHT_CACHE_PATH.name}.{os.getpid()}.tmp"
+            )
+            tmp_path.write_text(json.dumps(cache), encoding="utf-8")
+            os.replace(tmp_path, PREFLIGHT_CACHE_PATH)
+        except OSError:
+            pass
+
+
+def validate_filter_graph(
+    filter_complex: str,
+    inputs: list[list[str]],
+    output_maps: list[list[str]],
+    timeout: float = 20,
+) -> bool:
+    """filter_complex를 합성 입력으로 한 프레임만 돌려 보고 통과한 템플릿을 캐시합니다.
+
+    실패는 PNG 누락이나 일시적인 ffmpeg 오류일 수 있으므로 저장하지 않고 다음 렌더에서
+    다시 검사합니다.
+    """
+    if os.getenv("FILTER_PREFLIGHT") == "0":
+        return True
+    key = _template_key(filter_complex, inputs)
+    with _lock:
+        cached = _load_cache().get(key)
+    if cached:
+        return True
+
+    cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+    for args in inputs:
+        cmd += args
+    cmd += ["-filter_complex", filter_complex]
+    for maps in output_maps:
+        cmd += [*maps, "-t", str(_SYNTHETIC_SECONDS), "-f", "null", "-"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=False, timeout=timeout)
+    except FileNotFoundError:
+        return True
+    except subprocess.TimeoutExpired:
+        print(f"FILTER_PREFLIGHT_FAILED timeout after {timeout}s")
+        return False
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="ignore").strip()
+        print(f"FILTER_PREFLIGHT_FAILED rc={result.returncode}: {stderr[-500:]}")
+        return False
+    _store_pass(key)
+    return True
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urljoin
+
+import blob_store
+import http_client
+from ffmpeg_progress import run_ffmpeg
+
+
+TARGET_WIDTH = 720
+TARGET_HEIGHT = 1280
+DEFAULT_WORKERS = 6
+DEFAULT_RETRIES = 3
+_ATTR_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+@dataclass
+class HlsVariant:
+    url: str
+    bandwidth: int
+    width: int | None
+    height: int | None
+    audio_group: str | None = None
+
+
+@dataclass
+class HlsPlaylist:
+    segments: list[str]
+    init_segment: str | None
+    duration: float
+
+
+class UnsupportedPlaylist(Exception):
+    """암호화/바이트 범위/라이브 재생목록처럼 직접 받을 수 없는 경우."""
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key) or default))
+    except ValueError:
+        return default
+
+
+def _parse_attributes(line: str) -> dict[str, str]:
+    _, _, raw = line.partition(":")
+    return {key: value.strip('"') for key, value in _ATTR_RE.findall(raw)}
+
+
+def separate_audio_groups(text: str) -> set[str]:
+    """URI가 있는 EXT-X-MEDIA 오디오 렌디션의 GROUP-ID. 비디오 변형에는 소리가 없습니다."""
+    groups: set[str] = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith("#EXT-X-MEDIA:"):
+            continue
+        attributes = _parse_attributes(line)
+        if attributes.get("TYPE") == "AUDIO" and attributes.get("URI"):
+            groups.add(attributes.get("GROUP-ID", ""))
+    return groups
+
+
+def parse_master(text: str, base_url: str) -> list[HlsVariant]:
+    variants: list[HlsVariant] = []
+    pending: dict[str, str] | None = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF"):
+            pending = _parse_attributes(line)
+            continue
+        if pending is None or not line or line.startswith("#"):
+            continue
+        width = height = None
+        match = re.match(r"(\d+)x(\d+)", pending.get("RESOLUTION", ""))
+        if match:
+            width, height = int(match.group(1)), int(match.group(2))
+        bandwidth = pending.get("BANDWIDTH", "0")
+        variants.append(
+            HlsVariant(
+                url=urljoin(base_url, line),
+                bandwidth=int(bandwidth) if bandwidth.isdigit() else 0,
+                width=width,
+                height=height,
+                audio_group=pending.get("AUDIO"),
+            )
+        )
+        pending = None
+    return variants
+
+
+def pick_variant(variants: list[HlsVariant]) -> HlsVariant:
+    """출력 해상도(720x1280)에 가장 가까운 변형을 고르고, 같으면 비트레이트가 높은 쪽."""
+    target_short = min(TARGET_WIDTH, TARGET_HEIGHT)
+    target_long = max(TARGET_WIDTH, TARGET_HEIGHT)
+
+    def _score(variant: HlsVariant) -> tuple[int, int]:
+        if not variant.width or not variant.height:
+            return (10**9, -variant.bandwidth)
+        short_side = min(variant.width, variant.height)
+        long_side = max(variant.width, variant.height)
+        distance = abs(short_side - target_short) + abs(long_side - target_long)
+        return (distance, -variant.bandwidth)
+
+    return min(variants, key=_score)
+
+
+def parse_media(text: str, base_url: str) -> HlsPlaylist:
+    segments: list[str] = []
+    init_segment = None
+    duration = 0.0
+    if "#EXT-X-ENDLIST" not in text:
+        raise UnsupportedPlaylist("live playlist")
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-KEY"):
+            if _parse_attributes(line).get("METHOD", "NONE") != "NONE":
+                raise UnsupportedPlaylist("encrypted segments")
+        elif line.startswith("#EXT-X-BYTERANGE"):
+            raise UnsupportedPlaylist("byte-range segments")
+        elif line.startswith("#EXT-X-MAP"):
+            attributes = _parse_attributes(line)
+            if "BYTERANGE" in attributes:
+                raise UnsupportedPlaylist("byte-range init segment")
+            init_segment = urljoin(base_url, attributes.get("URI", ""))
+        elif line.startswith("#EXTINF"):
+            value = line.split(":", 1)[1].split(",", 1)[0]
+            try:
+                duration += float(value)
+            except ValueError:
+                pass
+        elif not line.startswith("#"):
+            segments.append(urljoin(base_url, line))
+    if not segments:
+        raise UnsupportedPlaylist("empty playlist")
+    return HlsPlaylist(segments=segments, init_segment=init_segment, duration=duration)
+
+
+def _resolve_playlist(url: str, referer: str | None) -> HlsPlaylist:
+    text = http_client.fetch_text(url, referer=referer, timeout=20)
+    if "#EXT-X-STREAM-INF" in text:
+        variants = parse_master(text, url)
+        if not variants:
+            raise UnsupportedPlaylist("master playlist without variants")
+        variant = pick_variant(variants)
+        if variant.audio_group and variant.audio_group in separate_audio_groups(text):
+            # 오디오가 별도 재생목록이면 세그먼트 병합으로는 소리가 빠지므로 ffmpeg에 맡깁니다.
+            raise UnsupportedPlaylist(f"separate audio rendition {variant.audio_group}")
+        print(
+            f"HLS_VARIANT {variant.width}x{variant.height} "
+            f"{variant.bandwidth}bps {variant.url}"
+        )
+        url = variant.url
+        text = http_client.fetch_text(url, referer=referer, timeout=20)
+    return parse_media(text, url)
+
+
+def _fetch_segment(url: str, path: Path, referer: str | None, retries: int) -> None:
+    # 완료된 세그먼트만 최종 이름으로 존재하므로 재실행 시 그대로 건너뜁니다.
+    if path.exists():
+        return
+    for attempt in range(retries + 1):
+        try:
+            http_client.stream_to_file(
+                url, path, referer=referer, timeout=20, allow_segments=False
+            )
+            return
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(min(8.0, 0.5 * 2**attempt))
+
+
+def fetch_hls(
+    url: str,
+    target_path: Path,
+    referer: str | None = None,
+    workers: int | None = None,
+) -> bool:
+    """m3u8을 직접 파싱해 세그먼트를 병렬로 받고 ffmpeg로 한 번만 리먹싱합니다.
+
+    직접 처리할 수 없는 재생목록이면 False를 반환하므로 호출부에서 ffmpeg 경로로 넘어가면 됩니다.
+    """
+    try:
+        playlist = _resolve_playlist(url, referer)
+    except UnsupportedPlaylist as exc:
+        print(f"HLS_FALLBACK {exc}: {url}")
+        return False
+
+    work_dir = target_path.with_name(f".{target_path.stem}.hls")
+    work_dir.mkdir(parents=True, exist_ok=True)
+    extension = ".mp4" if playlist.init_segment else ".ts"
+    parts: list[tuple[str, Path]] = []
+    if playlist.init_segment:
+        parts.append((playlist.init_segment, work_dir / f"init{extension}"))
+    for index, segment_url in enumerate(playlist.segments):
+        parts.append((segment_url, work_dir / f"seg_{index:05d}{extension}"))
+
+    retries = _env_int("HLS_SEGMENT_RETRIES", DEFAULT_RETRIES)
+    workers = workers or _env_int("HLS_WORKERS", DEFAULT_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hls") as executor:
+        futures = [
+            executor.submit(_fetch_segment, segment_url, path, referer, retries)
+            for segment_url, path in parts
+        ]
+        for future in futures:
+            future.result()
+
+    joined = work_dir / f"joined{extension}"
+    with open(joined, "wb") as output:
+        for _, path in parts:
+            with open(path, "rb") as source:
+                shutil.copyfileobj(source, output, length=1024 * 1024)
+
+    tmp_target = target_path.with_name(f".{target_path.name}.remux.mp4")
+    cmd = ["ffmpeg", "-y", "-i", str(joined), "-c", "copy"]
+    if extension == ".ts":
+        cmd += ["-bsf:a", "aac_adtstoasc"]
+    cmd += ["-movflags", "+faststart", str(tmp_target)]
+    result = run_ffmpeg(
+        cmd,
+        job_id=f"hls_remux_{target_path.stem}",
+        total_sec=playlist.duration or None,
+    )
+    if result.returncode != 0 or not tmp_target.exists():
+        tmp_target.unlink(missing_ok=True)
+        joined.unlink(missing_ok=True)
+        raise RuntimeError(result.stderr.strip() or "HLS remux failed")
+    # 직접 받은 mp4와 같이 해시 이름의 blob으로 넣고 target_path에 연결합니다.
+    blob_store.ingest_file(tmp_target, target_path)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return True
@@ -0,0 +1,618 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+DEFAULT_HEADERS = {
+    "User-Agent": DEFAULT_USER_AGENT,
+    "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+CHUNK_SIZE = 1024 * 1024
+# 검사 콜백에 먼저 넘기는 앞부분 크기. 첫 청크(1MB)를 다 받기 전에 판단할 수 있습니다.
+INSPECT_BYTES = 16 * 1024
+
+
+@dataclass
+class DownloadInfo:
+    path: Path
+    size: int
+    written: int
+    sha256: str | None = None
+
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_metrics = {
+    "requests": 0,
+    "errors": 0,
+    "retries": 0,
+    "resumes": 0,
+    "bytes": 0,
+    "latency_sec": 0.0,
+}
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key) or default)
+    except ValueError:
+        return default
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=int(_env_float("HTTP_RETRIES", 3)),
+        backoff_factor=_env_float("HTTP_BACKOFF", 0.5),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = int(_env_float("HTTP_POOL_SIZE", 16))
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """프로세스당 하나의 keep-alive 세션. fork된 워커에서는 새로 만듭니다."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def _headers(referer: str | None, headers: dict[str, str] | None) -> dict[str, str]:
+    merged = dict(headers or {})
+    if referer:
+        merged.setdefault("Referer", referer)
+    return merged
+
+
+def _record(key: str, value: float) -> None:
+    with _lock:
+        _metrics[key] += value
+
+
+def request(
+    method: str,
+    url: str,
+    referer: str | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+    **kwargs: Any,
+) -> requests.Response:
+    """공유 세션으로 요청을 보내고 요청 수/지연 시간을 기록합니다."""
+    started = time.monotonic()
+    _record("requests", 1)
+    try:
+        response = get_session().request(
+            method,
+            url,
+            headers=_headers(referer, headers),
+            timeout=timeout,
+            **kwargs,
+        )
+    except requests.RequestException:
+        _record("errors", 1)
+        raise
+    _record("latency_sec", time.monotonic() - started)
+    # urllib3 Retry가 429/5xx로 다시 보낸 횟수는 응답의 retries 기록에 남습니다.
+    retries = getattr(response.raw, "retries", None)
+    if retries is not None and retries.history:
+        _record("retries", len(retries.history))
+    return response
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def fetch_text(
+    url: str,
+    referer: str | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 20,
+) -> str:
+    response = get(url, referer=referer, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    _record("bytes", len(response.content))
+    return response.text
+
+
+def fetch_json(
+    url: str,
+    params: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+) -> Any:
+    response = get(url, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    _record("bytes", len(response.content))
+    return response.json()
+
+
+def file_sha256(path: Path) -> str:
+    """파일 전체의 sha256. 스트리밍 중 해시를 못 낸 경우와 blob_store 적재에 씁니다."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _part_paths(target_path: Path) -> tuple[Path, Path]:
+    part_path = target_path.with_name(f"{target_path.name}.part")
+    return part_path, part_path.with_name(f"{part_path.name}.json")
+
+
+def _read_part_meta(meta_path: Path, url: str) -> dict[str, Any]:
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return meta if meta.get("url") == url else {}
+
+
+def _total_size(response: requests.Response, offset: int) -> int | None:
+    content_range = response.headers.get("Content-Range", "")
+    match = re.match(r"bytes \d+-\d+/(\d+)", content_range)
+    if match:
+        return int(match.group(1))
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+class _RangeNotHonoured(Exception):
+    pass
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> None:
+    if hasattr(os, "pwrite"):
+        while data:
+            count = os.pwrite(fd, data, offset)
+            data = data[count:]
+            offset += count
+        return
+    # Windows에는 pwrite가 없으므로 세그먼트마다 따로 연 fd에서 seek 후 씁니다.
+    os.lseek(fd, offset, os.SEEK_SET)
+    while data:
+        count = os.write(fd, data)
+        data = data[count:]
+
+
+def _open_probe(
+    url: str,
+    referer: str | None,
+    headers: dict[str, str] | None,
+    timeout: float,
+) -> requests.Response | None:
+    """끝을 열어 둔 Range 요청으로 Range 지원 여부와 전체 크기를 확인합니다.
+
+    응답 본문은 버리지 않습니다. 분할하면 첫 세그먼트가, 작은 파일이거나 Range를
+    무시한 200 응답이면 단일 스트림 경로가 이 응답을 그대로 이어 읽습니다.
+    """
+    probe_headers = {**(headers or {}), "Range": "bytes=0-"}
+    try:
+        response = get(
+            url, referer=referer, headers=probe_headers, timeout=timeout, stream=True
+        )
+    except requests.RequestException:
+        return None
+    if response.status_code == 416:
+        # 빈 파일 등은 Range 없이 다시 요청하도록 단일 스트림 경로에 맡깁니다.
+        response.close()
+        return None
+    return response
+
+
+def _split_ranges(total: int, segments: int) -> list[list[int]]:
+    size = -(-total // segments)
+    return [
+        [start, min(total, start + size) - 1, 0]
+        for start in range(0, total, size)
+    ]
+
+
+def _download_segments(
+    url: str,
+    part_path: Path,
+    meta_path: Path,
+    meta: dict[str, Any],
+    referer: str | None,
+    headers: dict[str, str] | None,
+    timeout: float,
+    segments: int,
+    max_resumes: int,
+    first: tuple[requests.Response, bytes] | None = None,
+) -> int:
+    total = meta["total"]
+    ranges = meta.setdefault("segments", _split_ranges(total, segments))
+    validator = meta.get("etag") or meta.get("last_modified")
+    meta_lock = threading.Lock()
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    # 전체 크기로 미리 할당해 두고 각 세그먼트가 자기 위치에 직접 씁니다.
+    with open(part_path, "r+b" if part_path.exists() else "wb") as handle:
+        handle.truncate(total)
+        if first is not None and first[1]:
+            handle.write(first[1])
+
+    def _fetch(index: int) -> int:
+        start, end, done = ranges[index]
+        if done:
+            return 0
+        position = start
+        response = None
+        if index == 0 and first is not None:
+            # 프로브 응답은 0바이트부터 이어지므로 첫 세그먼트로 그대로 씁니다.
+            response, head = first
+            position += len(head)
+        for attempt in range(max_resumes + 1):
+            try:
+                if response is None:
+                    # 끊긴 세그먼트는 이미 쓴 바이트 다음부터 이어받습니다.
+                    segment_headers = {
+                        **(headers or {}),
+                        "Range": f"bytes={position}-{end}",
+                    }
+                    if validator:
+                        segment_headers["If-Range"] = validator
+                    response = get(
+                        url,
+                        referer=referer,
+                        headers=segment_headers,
+                        timeout=timeout,
+                        stream=True,
+                    )
+                with response:
+                    if response.status_code != 206:
+                        raise _RangeNotHonoured(response.status_code)
+                    fd = os.open(part_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+                    try:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            chunk = chunk[: end + 1 - position]
+                            if chunk:
+                                _pwrite(fd, chunk, position)
+                                position += len(chunk)
+                            if position > end:
+                                break
+                    finally:
+                        os.close(fd)
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ):
+                if attempt >= max_resumes:
+                    raise
+                _record("resumes", 1)
+                continue
+            finally:
+                response = None
+            if position == end + 1:
+                break
+            if attempt >= max_resumes:
+                raise IOError(f"세그먼트 크기 불일치: {start}-{end} ({url})")
+            _record("resumes", 1)
+        with meta_lock:
+            ranges[index][2] = 1
+            meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        _record("bytes", end + 1 - start)
+        return end + 1 - start
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=min(segments, len(ranges)), thread_name_prefix="segment"
+        ) as executor:
+            return sum(executor.map(_fetch, range(len(ranges))))
+    finally:
+        if first is not None:
+            first[0].close()
+
+
+def _try_segmented(
+    url: str,
+    target_path: Path,
+    referer: str | None,
+    headers: dict[str, str] | None,
+    timeout: float,
+    max_resumes: int,
+    make_inspector: Callable[[], Callable[[bytes], Any]] | None = None,
+) -> tuple[int | None, requests.Response | None]:
+    """큰 파일은 바이트 범위로 나눠 여러 연결에서 병렬로 받습니다.
+
+    (받은 바이트 수, None)을 반환하고, 분할하지 않으면 (None, 단일 스트림이 이어 읽을
+    프로브 응답 또는 None)을 반환합니다.
+    """
+    segments = int(_env_float("HTTP_SEGMENTS", 4))
+    threshold = _env_float("HTTP_SEGMENT_THRESHOLD_MB", 32) * 1024 * 1024
+    if segments <= 1:
+        return None, None
+    part_path, meta_path = _part_paths(target_path)
+    meta = _read_part_meta(meta_path, url)
+    if meta and "segments" in meta:
+        # 완료 표시만 남고 부분 파일이 없거나 크기가 다르면 그 구간이 0으로 채워진 채
+        # 완성본이 되므로 메타데이터를 버리고 처음부터 받습니다.
+        try:
+            intact = part_path.stat().st_size == meta.get("total")
+        except OSError:
+            intact = False
+        if not intact:
+            meta_path.unlink(missing_ok=True)
+            meta = {}
+    if meta and "segments" not in meta:
+        # 단일 스트림으로 받던 부분 파일은 그쪽 경로에서 이어받습니다.
+        return None, None
+    first: tuple[requests.Response, bytes] | None = None
+    if not meta:
+        part_path.unlink(missing_ok=True)
+        response = _open_probe(url, referer, headers, timeout)
+        if response is None:
+            return None, None
+        total = _total_size(response, 0) if response.status_code == 206 else None
+        if not total or total < threshold:
+            return None, response
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "total": total,
+        }
+        head = b""
+        if make_inspector:
+            # 세그먼트는 순서 없이 도착하므로 앞부분만 검사하고 나머지는 받은 뒤 확인합니다.
+            try:
+                head = response.raw.read(INSPECT_BYTES, decode_content=True) or b""
+                make_inspector()(head)
+            except Exception:
+                response.close()
+                raise
+        first = (response, head)
+    try:
+        written = _download_segments(
+            url,
+            part_path,
+            meta_path,
+            meta,
+            referer,
+            headers,
+            timeout,
+            segments,
+            max_resumes,
+            first,
+        )
+    except _RangeNotHonoured:
+        part_path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        return None, None
+    if part_path.stat().st_size != meta["total"]:
+        raise IOError(f"다운로드 크기 불일치 ({url})")
+    os.replace(part_path, target_path)
+    meta_path.unlink(missing_ok=True)
+    return written, None
+
+
+def _iter_body(response: requests.Response, head_bytes: int):
+    if head_bytes:
+        head = response.raw.read(head_bytes, decode_content=True)
+        if head:
+            yield head
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if chunk:
+            yield chunk
+
+
+def stream_to_file(
+    url: str,
+    target_path: Path,
+    referer: str | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+    max_resumes: int | None = None,
+    allow_segments: bool = True,
+    sha256: bool = False,
+    make_inspector: Callable[[], Callable[[bytes], Any]] | None = None,
+) -> DownloadInfo:
+    """<target>.part에 받아 두고 끊기면 Range + If-Range로 이어받습니다.
+
+    크기가 Content-Length/Content-Range와 맞을 때만 원자적으로 target_path로 옮기므로
+    실패한 다운로드가 완성된 파일처럼 남지 않습니다. sha256=True이면 받는 동안 해시를
+    계산하고, 이어받기/분할 다운로드처럼 순서대로 흘려보내지 못한 경우에만 파일을 다시 읽습니다.
+    make_inspector는 검사 콜백을 만드는 함수로, 0바이트부터 다시 쓸 때마다 새 콜백을
+    만들어 파일 앞에서부터 이어지는 바이트를 넘깁니다. 콜백이 예외를 던지면 받던 부분
+    파일을 지우고 그 예외를 그대로 올립니다(예: 영상이 아닌 HTML 응답을 일찍 중단).
+    """
+    target_path = Path(target_path)
+    part_path, meta_path = _part_paths(target_path)
+    if max_resumes is None:
+        max_resumes = int(_env_float("HTTP_MAX_RESUMES", 5))
+    first = None
+    if allow_segments:
+        segmented, first = _try_segmented(
+            url, target_path, referer, headers, timeout, max_resumes, make_inspector
+        )
+        if segmented is not None:
+            return DownloadInfo(
+                path=target_path,
+                size=target_path.stat().st_size,
+                written=segmented,
+                sha256=file_sha256(target_path) if sha256 else None,
+            )
+    meta = _read_part_meta(meta_path, url)
+    if not meta:
+        part_path.unlink(missing_ok=True)
+    written = 0
+    attempt = 0
+    hasher = None
+    hashed = 0
+    inspector = None
+    inspected = 0
+    rejected: Exception | None = None
+    while True:
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        validator = meta.get("etag") or meta.get("last_modified")
+        request_headers = dict(headers or {})
+        if offset and validator:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+        elif offset:
+            # 검증할 수 없는 부분 파일은 이어 붙이지 않고 처음부터 받습니다.
+            offset = 0
+        try:
+            # 분할 여부를 확인한 프로브 응답이 있으면 새로 요청하지 않고 그 본문을 읽습니다.
+            pending, first = first, None
+            if pending is None:
+                pending = get(
+                    url,
+                    referer=referer,
+                    headers=request_headers,
+                    timeout=timeout,
+                    stream=True,
+                )
+            with pending as response:
+                if response.status_code == 416 and offset:
+                    if offset == meta.get("total"):
+                        break
+                    part_path.unlink(missing_ok=True)
+                    meta = {}
+                    continue
+                response.raise_for_status()
+                if response.status_code != 206:
+                    offset = 0
+                total = _total_size(response, offset)
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag") or meta.get("etag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                    or meta.get("last_modified"),
+                    "total": total,
+                }
+                meta_path.write_text(json.dumps(meta), encoding="utf-8")
+                if sha256 and not offset:
+                    hasher = hashlib.sha256()
+                    hashed = 0
+                elif hashed != offset:
+                    hasher = None
+                if make_inspector and not offset:
+                    # 200 응답/416/재시도로 처음부터 다시 쓰면 검사 상태도 새로 시작합니다.
+                    inspector = make_inspector()
+                    inspected = 0
+                check = inspector if inspected == offset else None
+                with open(part_path, "ab" if offset else "wb") as handle:
+                    for chunk in _iter_body(response, INSPECT_BYTES if check else 0):
+                        if check is not None:
+                            try:
+                                check(chunk)
+                            except Exception as exc:
+                                rejected = exc
+                                break
+                            inspected += len(chunk)
+                        handle.write(chunk)
+                        written += len(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                            hashed += len(chunk)
+                if rejected is not None:
+                    part_path.unlink(missing_ok=True)
+                    meta_path.unlink(missing_ok=True)
+                    _record("bytes", written)
+                    raise rejected
+        except (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ) as error:
+            attempt += 1
+            if attempt > max_resumes:
+                _record("bytes", written)
+                raise
+            _record("resumes", 1)
+            print(f"⚠️ 다운로드 끊김, 이어받기 {attempt}/{max_resumes}: {error}")
+            continue
+        size = part_path.stat().st_size
+        total = meta.get("total")
+        if total is None or size == total:
+            break
+        attempt += 1
+        if size > total or attempt > max_resumes:
+            _record("bytes", written)
+            raise IOError(f"다운로드 크기 불일치: {size} != {total} ({url})")
+        _record("resumes", 1)
+
+    _record("bytes", written)
+    size = part_path.stat().st_size
+    digest = None
+    if sha256:
+        if hasher is not None and hashed == size:
+            digest = hasher.hexdigest()
+        else:
+            digest = file_sha256(part_path)
+    os.replace(part_path, target_path)
+    meta_path.unlink(missing_ok=True)
+    return DownloadInfo(path=target_path, size=size, written=written, sha256=digest)
+
+
+def _pool_counts() -> tuple[int, int]:
+    """urllib3 커넥션 풀의 (요청 수, 새 연결 수) 합계."""
+    if _session is None:
+        return 0, 0
+    total_requests = 0
+    total_connections = 0
+    for adapter in set(_session.adapters.values()):
+        manager = getattr(adapter, "poolmanager", None)
+        pools = getattr(manager, "pools", None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += getattr(pool, "num_requests", 0)
+            total_connections += getattr(pool, "num_connections", 0)
+    return total_requests, total_connections
+
+
+def metrics() -> dict[str, Any]:
+    """요청/오류/재시도/이어받기 횟수와 연결 재사용률. 배치가 끝날 때 HTTP_METRICS로 찍습니다."""
+    with _lock:
+        snapshot: dict[str, Any] = dict(_metrics)
+    pool_requests, pool_connections = _pool_counts()
+    snapshot["connections"] = pool_connections
+    snapshot["reuse_ratio"] = (
+        round(1 - pool_connections / pool_requests, 3) if pool_requests else None
+    )
+    if snapshot["requests"]:
+        snapshot["avg_latency_sec"] = round(
+            snapshot["latency_sec"] / snapshot["requests"], 3
+        )
+    return snapshot
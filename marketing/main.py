@@ -1,11 +1,15 @@
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import yt_dlp
 from moviepy import VideoFileClip, ColorClip, CompositeVideoClip, ImageClip, AudioFileClip, CompositeAudioClip
 import moviepy.audio.fx as afx
 from PIL import Image, ImageDraw, ImageFont
-from gtts import gTTS
 
-from storage_paths import PROCESSED_DIR, RAW_DIR, ensure_storage_dirs
+from ffmpeg_progress import run_ffmpeg
+from media_probe import probe_media
+from storage_paths import PROCESSED_DIR, RAW_DIR, SCRATCH_DIR, ensure_storage_dirs
+from tts_cache import cache_stats, prefetch, synthesize_to
 
 class VideoMonetizer:
     def __init__(self, input_dir: str | None = None, output_dir: str | None = None):
@@ -64,56 +68,146 @@ class VideoMonetizer:
         img.save(filename)
 
     def create_voice(self, text, filename):
-        tts = gTTS(text=text, lang='ko')
-        tts.save(filename)
-
-    def process_all(self):
-        # 1. 먼저 다운로드 수행
-        self.download_videos()
-
-        # 2. 이후 가공 작업 진행
-        files = [f for f in os.listdir(self.input_dir) if f.endswith('.mp4')]
-        bgm_path = "video_bgm/bgm.mp3"
-
-        for filename in files:
-            raw_name = os.path.splitext(filename)[0]
-            display_title = raw_name[:15] # 제목이 너무 길면 자막이 깨지므로 15자 제한
-            input_path = os.path.join(self.input_dir, filename)
-            output_path = os.path.join(self.output_dir, f"shorts_{filename}")
+        # 같은 문장은 storage/cache/tts에 저장된 음성을 재사용합니다.
+        synthesize_to(text, filename, lang='ko')
+
+    @staticmethod
+    def voice_text(display_title):
+        return f"{display_title}. 지금 바로 확인해보세요!"
+
+    def _render_moviepy(self, input_path, output_path, bgm_path, top_png, bottom_png, voice_path):
+        with VideoFileClip(input_path) as clip:
+            w, h = clip.size
+            x1, y1, x2, y2 = int(w*0.18), int(h*0.18), int(w*0.82), int(h*0.82)
+            width, height = (x2-x1)//2*2, (y2-y1)//2*2
+            processed_clip = clip.cropped(x1=x1, y1=y1, x2=x1+width, y2=y1+height)
             
-            print(f"🎬 가공 중: {display_title}")
-            self.create_text_image(display_title, "top_text.png")
-            self.create_text_image("구매 링크는 댓글 확인! 👇", "bottom_text.png", color=(255, 255, 255), size=55)
-            self.create_voice(f"{display_title}. 지금 바로 확인해보세요!", "voice.mp3")
-
+            bar_h = int(height * 0.2)
+            top_bar = ColorClip(size=(width, bar_h), color=(0,0,0)).with_duration(clip.duration).with_position(("center", "top"))
+            bottom_bar = ColorClip(size=(width, bar_h), color=(0,0,0)).with_duration(clip.duration).with_position(("center", "bottom"))
+            t_clip = ImageClip(top_png).with_duration(clip.duration).resized(width=width*0.8).with_position(("center", (bar_h // 2) - 35))
+            b_clip = ImageClip(bottom_png).with_duration(clip.duration).resized(width=width*0.8).with_position(("center", height - (bar_h // 2) - 27))
+
+            voice_audio = AudioFileClip(voice_path)
+            if os.path.exists(bgm_path):
+                bgm = AudioFileClip(bgm_path).with_effects([afx.AudioLoop(duration=clip.duration), afx.MultiplyVolume(0.3)])
+                final_audio = CompositeAudioClip([bgm, voice_audio])
+            else:
+                final_audio = voice_audio
+            
+            final_video = CompositeVideoClip([processed_clip, top_bar, bottom_bar, t_clip, b_clip]).with_audio(final_audio)
+            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=clip.fps, logger=None)
+
+    def _render_ffmpeg(self, input_path, output_path, bgm_path, top_png, bottom_png, voice_path):
+        """MoviePy 경로와 같은 크롭/검은 바/자막/보이스+BGM 레이아웃을 ffmpeg 필터 그래프 하나로 처리합니다."""
+        info = probe_media(input_path)
+        if info is None or not info.has_video:
+            raise RuntimeError(f"영상 정보를 읽을 수 없습니다: {input_path}")
+        w, h = info.width, info.height
+        x1, y1, x2, y2 = int(w*0.18), int(h*0.18), int(w*0.82), int(h*0.82)
+        width, height = (x2-x1)//2*2, (y2-y1)//2*2
+        bar_h = int(height * 0.2)
+        caption_w = int(width * 0.8)
+
+        video_graph = (
+            f"[0:v]crop={width}:{height}:{x1}:{y1},"
+            f"drawbox=x=0:y=0:w=iw:h={bar_h}:color=black:t=fill,"
+            f"drawbox=x=0:y=ih-{bar_h}:w=iw:h={bar_h}:color=black:t=fill[base];"
+            f"[1:v]scale={caption_w}:-1[top];"
+            f"[2:v]scale={caption_w}:-1[bottom];"
+            f"[base][top]overlay=x=(W-w)/2:y={(bar_h // 2) - 35}[v1];"
+            f"[v1][bottom]overlay=x=(W-w)/2:y={height - (bar_h // 2) - 27}[v]"
+        )
+        cmd = ["ffmpeg", "-y", "-i", input_path, "-i", top_png, "-i", bottom_png, "-i", voice_path]
+        if os.path.exists(bgm_path):
+            cmd += ["-stream_loop", "-1", "-i", bgm_path]
+            # CompositeAudioClip처럼 정규화 없이 합산하고 길이는 영상에 맞춥니다.
+            audio_graph = (
+                f"[4:a]volume=0.3,atrim=0:{info.duration:.3f}[bgm];"
+                "[bgm][3:a]amix=inputs=2:duration=first:normalize=0[a]"
+            )
+        else:
+            audio_graph = "[3:a]anull[a]"
+        cmd += [
+            "-filter_complex", f"{video_graph};{audio_graph}",
+            "-map", "[v]", "-map", "[a]",
+            "-t", f"{info.duration:.3f}",
+            "-r", f"{info.fps:.3f}" if info.fps else "30",
+            "-c:v", "libx264", "-c:a", "aac",
+            output_path,
+        ]
+        result = run_ffmpeg(cmd, job_id=f"monetizer_{os.path.basename(output_path)}", total_sec=info.duration)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "ffmpeg failed")
+
+    def process_file(self, filename, bgm_path="video_bgm/bgm.mp3", backend=None):
+        backend = (backend or os.getenv("MONETIZER_BACKEND") or "moviepy").lower()
+        display_title = _display_title(filename)
+        input_path = os.path.join(self.input_dir, filename)
+        output_path = os.path.join(self.output_dir, f"shorts_{filename}")
+        
+        print(f"🎬 가공 중: {display_title} ({backend})")
+        # 작업마다 임시 폴더를 따로 써서 동시에 돌려도 자막/음성 파일이 섞이지 않습니다.
+        with tempfile.TemporaryDirectory(prefix="monetizer_", dir=SCRATCH_DIR) as scratch:
+            top_png = os.path.join(scratch, "top_text.png")
+            bottom_png = os.path.join(scratch, "bottom_text.png")
+            voice_path = os.path.join(scratch, "voice.mp3")
             try:
-                with VideoFileClip(input_path) as clip:
-                    w, h = clip.size
-                    x1, y1, x2, y2 = int(w*0.18), int(h*0.18), int(w*0.82), int(h*0.82)
-                    width, height = (x2-x1)//2*2, (y2-y1)//2*2
-                    processed_clip = clip.cropped(x1=x1, y1=y1, x2=x1+width, y2=y1+height)
-                    
-                    bar_h = int(height * 0.2)
-                    top_bar = ColorClip(size=(width, bar_h), color=(0,0,0)).with_duration(clip.duration).with_position(("center", "top"))
-                    bottom_bar = ColorClip(size=(width, bar_h), color=(0,0,0)).with_duration(clip.duration).with_position(("center", "bottom"))
-                    t_clip = ImageClip("top_text.png").with_duration(clip.duration).resized(width=width*0.8).with_position(("center", (bar_h // 2) - 35))
-                    b_clip = ImageClip("bottom_text.png").with_duration(clip.duration).resized(width=width*0.8).with_position(("center", height - (bar_h // 2) - 27))
-
-                    voice_audio = AudioFileClip("voice.mp3")
-                    if os.path.exists(bgm_path):
-                        bgm = AudioFileClip(bgm_path).with_effects([afx.AudioLoop(duration=clip.duration), afx.MultiplyVolume(0.3)])
-                        final_audio = CompositeAudioClip([bgm, voice_audio])
-                    else:
-                        final_audio = voice_audio
-                    
-                    final_video = CompositeVideoClip([processed_clip, top_bar, bottom_bar, t_clip, b_clip]).with_audio(final_audio)
-                    final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=clip.fps, logger=None)
+                self.create_text_image(display_title, top_png)
+                self.create_text_image("구매 링크는 댓글 확인! 👇", bottom_png, color=(255, 255, 255), size=55)
+                self.create_voice(self.voice_text(display_title), voice_path)
+
+                render = self._render_ffmpeg if backend == "ffmpeg" else self._render_moviepy
+                render(input_path, output_path, bgm_path, top_png, bottom_png, voice_path)
                 
                 # 가공 완료 후 원본은 삭제 (원치 않으면 아래 줄 주석 처리)
                 # os.remove(input_path)
                 print(f"✅ 완성: {output_path}")
+                return output_path
             except Exception as e:
                 print(f"❌ 에러: {e}")
+                return None
+
+    def process_all(self, backend=None, workers=None):
+        """backend: "moviepy"(기본) 또는 "ffmpeg". 지정하지 않으면 MONETIZER_BACKEND 환경 변수를 따릅니다.
+        workers: 동시에 가공할 프로세스 수 (기본 MONETIZER_WORKERS 또는 1)."""
+        # 1. 먼저 다운로드 수행
+        self.download_videos()
+
+        # 2. 이후 가공 작업 진행
+        files = [f for f in os.listdir(self.input_dir) if f.endswith('.mp4')]
+        bgm_path = "video_bgm/bgm.mp3"
+        workers = _resolve_workers(workers)
+
+        # 렌더 전에 음성을 병렬로 미리 합성해 두면 워커들은 캐시만 읽습니다.
+        prefetch([self.voice_text(_display_title(f)) for f in files], lang='ko')
+
+        if workers <= 1 or len(files) <= 1:
+            results = [self.process_file(filename, bgm_path, backend=backend) for filename in files]
+            print(f"🔊 TTS 캐시: {cache_stats()}")
+            return results
+
+        results = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+            futures = {
+                executor.submit(
+                    _process_file_job,
+                    self.input_dir,
+                    self.output_dir,
+                    self.font_path,
+                    filename,
+                    bgm_path,
+                    backend,
+                ): filename
+                for filename in files
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"❌ 에러 ({futures[future]}): {e}")
+                    results.append(None)
+        return results
 
     def run_pipeline(self, urls, affiliate_link):
         from downloader import run_collect
@@ -126,6 +220,28 @@ class VideoMonetizer:
         run_collect(urls, affiliate_link, user_agent)
         self.process_all()
 
+
+def _display_title(filename):
+    raw_name = os.path.splitext(filename)[0]
+    return raw_name[:15] # 제목이 너무 길면 자막이 깨지므로 15자 제한
+
+
+def _resolve_workers(workers=None):
+    if workers is None:
+        workers = os.getenv("MONETIZER_WORKERS") or 1
+    try:
+        return max(1, int(workers))
+    except ValueError:
+        return 1
+
+
+def _process_file_job(input_dir, output_dir, font_path, filename, bgm_path, backend):
+    # ProcessPoolExecutor 워커에서 실행되므로 모듈 수준 함수로 둡니다.
+    monetizer = VideoMonetizer(input_dir=input_dir, output_dir=output_dir)
+    monetizer.font_path = font_path
+    return monetizer.process_file(filename, bgm_path, backend=backend)
+
+
 if __name__ == "__main__":
     monetizer = VideoMonetizer()
     monetizer.process_all()
\ No newline at end of file
@@ -6,7 +6,7 @@ import sys
 
 from db_manager import DatabaseManager
 from video_downloader import download_ready_products
-from video_processor import process_downloaded
+from video_processor import RenderBatchError, process_downloaded
 
 
 def run_manual_test() -> None:
@@ -43,7 +43,13 @@ def run_manual_test() -> None:
         print(f"[DOWNLOAD] 영상 다운로드 실패 {result.origin_url}")
 
     product_ids = {result.product_id} if result.success else set()
-    processed = process_downloaded(limit=1, track="MANUAL", product_ids=product_ids)
+    try:
+        processed = process_downloaded(
+            limit=1, track="MANUAL", product_ids=product_ids
+        )
+    except RenderBatchError as exc:
+        print(f"[PROCESS] 영상 가공 실패 {exc.failures}")
+        processed = exc.processed
     if processed:
         print("[PROCESS] 영상 가공 완료")
         print("[STATUS] PROCESSED 전환")
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+PROBE_CACHE_DIR = CACHE_DIR / "media_probe"
+
+
+@dataclass
+class MediaInfo:
+    duration: float
+    width: int
+    height: int
+    video_codec: str | None
+    audio_codec: str | None
+    fps: float
+    has_video: bool
+    has_audio: bool
+
+
+def _parse_rate(value: str | None) -> float:
+    if not value:
+        return 0.0
+    try:
+        if "/" in value:
+            num, den = value.split("/", 1)
+            return float(num) / float(den) if float(den) else 0.0
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def _parse_probe_json(payload: dict) -> MediaInfo:
+    streams = payload.get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    duration = 0.0
+    try:
+        duration = float((payload.get("format") or {}).get("duration") or 0)
+    except ValueError:
+        pass
+    if not duration and video:
+        try:
+            duration = float(video.get("duration") or 0)
+        except ValueError:
+            pass
+    fps = 0.0
+    if video:
+        fps = _parse_rate(video.get("avg_frame_rate")) or _parse_rate(
+            video.get("r_frame_rate")
+        )
+    return MediaInfo(
+        duration=duration,
+        width=int(video.get("width") or 0) if video else 0,
+        height=int(video.get("height") or 0) if video else 0,
+        video_codec=video.get("codec_name") if video else None,
+        audio_codec=audio.get("codec_name") if audio else None,
+        fps=fps,
+        has_video=video is not None,
+        has_audio=audio is not None,
+    )
+
+
+def _cache_file(path: Path) -> Path:
+    # admin-lab validate route가 같은 키로 읽으므로 절대 경로 문자열의 sha1을 씁니다.
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return PROBE_CACHE_DIR / f"{digest}.json"
+
+
+def _read_cache(path: Path, size: int, mtime_ns: int) -> MediaInfo | None:
+    cache_file = _cache_file(path)
+    try:
+        entry = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if entry.get("size") != size or entry.get("mtime_ns") != str(mtime_ns):
+        return None
+    try:
+        return MediaInfo(**entry["info"])
+    except (KeyError, TypeError):
+        return None
+
+
+def _write_cache(path: Path, size: int, mtime_ns: int, info: MediaInfo) -> None:
+    cache_file = _cache_file(path)
+    entry = {
+        "path": os.path.abspath(path),
+        "size": size,
+        # JS Number로는 ns 정밀도가 깨지므로 admin-lab route와 맞춰 문자열로 둡니다.
+        "mtime_ns": str(mtime_ns),
+        "info": asdict(info),
+    }
+    try:
+        PROBE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_file.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def _run_ffprobe(path: Path) -> MediaInfo | None:
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-print_format",
+                "json",
+                "-show_format",
+                "-show_streams",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            check=False,
+        )
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return _parse_probe_json(json.loads(result.stdout or "{}"))
+    except ValueError:
+        return None
+
+
+def probe_media(path: Path | str) -> MediaInfo | None:
+    """ffprobe 한 번으로 스트림/길이/해상도/코덱/fps를 읽고 path+size+mtime 기준으로 캐시합니다."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    cached = _read_cache(path, stat.st_size, stat.st_mtime_ns)
+    if cached is not None:
+        return cached
+    info = _run_ffprobe(path)
+    if info is not None:
+        _write_cache(path, stat.st_size, stat.st_mtime_ns, info)
+    return info
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Probe media files (cached)")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for value in args.paths:
+        info = probe_media(value)
+        payload = asdict(info) if info else None
+        print(json.dumps({"path": value, "info": payload}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
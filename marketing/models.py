@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     Enum,
@@ -191,6 +192,29 @@ class VideoAsset(Base):
     )
 
 
+class VideoFingerprint(Base):
+    """원본 영상의 지각 해시(샘플 프레임별 64비트 dHash)."""
+
+    __tablename__ = "video_fingerprints"
+    __table_args__ = (
+        Index("ix_video_fingerprints_product_id", "product_id"),
+        Index("ix_video_fingerprints_created_at", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    product_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("products.id"), nullable=True
+    )
+    source_url: Mapped[str | None] = mapped_column(Text, nullable=True)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    frame_hashes: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+
+
 class UploadLog(Base):
     __tablename__ = "upload_logs"
     __table_args__ = (
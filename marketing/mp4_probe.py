@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from media_probe import probe_media
+
+
+# 스트리밍 검사에서 moov를 통째로 모으는 상한. 넘으면 검사를 포기하고 파일 검사에 맡깁니다.
+MAX_STREAM_MOOV_BYTES = 32 * 1024 * 1024
+_FIRST_BOXES = {
+    b"ftyp",
+    b"styp",
+    b"moov",
+    b"mdat",
+    b"free",
+    b"skip",
+    b"wide",
+    b"pdin",
+    b"uuid",
+    b"moof",
+    b"sidx",
+}
+# MP4가 아닌 영상 컨테이너는 여기서 판단하지 않고 ffprobe에 넘깁니다.
+_OTHER_SIGNATURES = (
+    (b"\x1a\x45\xdf\xa3", "matroska"),
+    (b"FLV", "flv"),
+    (b"RIFF", "avi"),
+)
+
+
+class NotAVideo(ValueError):
+    """MP4/MOV가 아니거나 비디오 트랙이 없는 응답."""
+
+
+@dataclass
+class Mp4Track:
+    track_id: int
+    handler: str
+    codec: str | None
+    width: int
+    height: int
+    duration_us: int
+
+
+@dataclass
+class Mp4Info:
+    major_brand: str | None
+    duration_us: int
+    faststart: bool
+    tracks: list[Mp4Track] = field(default_factory=list)
+
+    @property
+    def has_video(self) -> bool:
+        return any(track.handler == "vide" for track in self.tracks)
+
+    @property
+    def has_audio(self) -> bool:
+        return any(track.handler == "soun" for track in self.tracks)
+
+
+def _box_header(buf, offset: int, end: int) -> tuple[bytes, int, int] | None:
+    """(타입, payload 시작, box 끝). 헤더가 잘렸거나 크기가 말이 안 되면 None."""
+    if end - offset < 8:
+        return None
+    size, kind = struct.unpack_from(">I4s", buf, offset)
+    header = 8
+    if size == 1:
+        if end - offset < 16:
+            return None
+        (size,) = struct.unpack_from(">Q", buf, offset + 8)
+        header = 16
+    elif size == 0:
+        size = end - offset
+    if size < header:
+        return None
+    return bytes(kind), offset + header, offset + size
+
+
+def _iter_boxes(buf, start: int, end: int):
+    offset = start
+    # QuickTime은 컨테이너 끝에 4바이트 0 종결자를 두기도 하므로 8바이트 미만은 무시합니다.
+    while end - offset >= 8:
+        parsed = _box_header(buf, offset, end)
+        if parsed is None or parsed[2] > end:
+            raise NotAVideo(f"손상된 box 구조 (offset {offset})")
+        yield parsed
+        offset = parsed[2]
+
+
+def _find_box(buf, start: int, end: int, kind: bytes) -> tuple[int, int] | None:
+    for box_kind, payload, box_end in _iter_boxes(buf, start, end):
+        if box_kind == kind:
+            return payload, box_end
+    return None
+
+
+def _plausible_type(kind: bytes) -> bool:
+    return all(32 <= byte < 127 for byte in kind)
+
+
+def _fourcc(raw: bytes) -> str:
+    return raw.decode("latin-1").strip("\x00 ") or "?"
+
+
+def _timed_duration(buf, payload: int) -> tuple[int, int]:
+    """mvhd/mdhd에서 (timescale, duration)을 읽습니다. version 1은 64비트 필드."""
+    if buf[payload] == 1:
+        timescale, duration = struct.unpack_from(">IQ", buf, payload + 20)
+        unknown = 0xFFFFFFFFFFFFFFFF
+    else:
+        timescale, duration = struct.unpack_from(">II", buf, payload + 12)
+        unknown = 0xFFFFFFFF
+    if duration == unknown:
+        duration = 0
+    return timescale, duration
+
+
+def _to_us(timescale: int, duration: int) -> int:
+    return duration * 1_000_000 // timescale if timescale else 0
+
+
+def _parse_trak(buf, start: int, end: int) -> Mp4Track:
+    track_id = width = height = 0
+    tkhd = _find_box(buf, start, end, b"tkhd")
+    if tkhd:
+        payload = tkhd[0]
+        wide = buf[payload] == 1
+        (track_id,) = struct.unpack_from(">I", buf, payload + (20 if wide else 12))
+        # 너비/높이는 16.16 고정소수점
+        size_offset = payload + (88 if wide else 76)
+        fixed_w, fixed_h = struct.unpack_from(">II", buf, size_offset)
+        width, height = fixed_w >> 16, fixed_h >> 16
+
+    handler = "?"
+    codec = None
+    duration_us = 0
+    mdia = _find_box(buf, start, end, b"mdia")
+    if mdia:
+        mdhd = _find_box(buf, *mdia, b"mdhd")
+        if mdhd:
+            duration_us = _to_us(*_timed_duration(buf, mdhd[0]))
+        hdlr = _find_box(buf, *mdia, b"hdlr")
+        if hdlr:
+            handler = _fourcc(bytes(buf[hdlr[0] + 8 : hdlr[0] + 12]))
+        minf = _find_box(buf, *mdia, b"minf")
+        stbl = _find_box(buf, *minf, b"stbl") if minf else None
+        stsd = _find_box(buf, *stbl, b"stsd") if stbl else None
+        if stsd and stsd[1] - stsd[0] >= 16:
+            entry = stsd[0] + 8
+            codec = _fourcc(bytes(buf[entry + 4 : entry + 8]))
+            if handler == "vide" and entry + 36 <= stsd[1]:
+                width, height = struct.unpack_from(">HH", buf, entry + 32)
+    return Mp4Track(
+        track_id=track_id,
+        handler=handler,
+        codec=codec,
+        width=width,
+        height=height,
+        duration_us=duration_us,
+    )
+
+
+def _parse_moov(buf, start: int, end: int) -> tuple[int, list[Mp4Track]]:
+    duration_us = 0
+    tracks: list[Mp4Track] = []
+    for kind, payload, box_end in _iter_boxes(buf, start, end):
+        if kind == b"mvhd":
+            duration_us = _to_us(*_timed_duration(buf, payload))
+        elif kind == b"trak":
+            tracks.append(_parse_trak(buf, payload, box_end))
+    if not duration_us:
+        duration_us = max((track.duration_us for track in tracks), default=0)
+    return duration_us, tracks
+
+
+def _parse(buf, size: int) -> Mp4Info:
+    major_brand = None
+    moov = None
+    seen_mdat = False
+    faststart = False
+    for index, (kind, payload, box_end) in enumerate(_iter_boxes(buf, 0, size)):
+        if index == 0 and kind not in _FIRST_BOXES:
+            raise NotAVideo(f"MP4/MOV가 아닙니다 (첫 box {kind!r})")
+        if kind == b"ftyp" and box_end - payload >= 4:
+            major_brand = _fourcc(bytes(buf[payload : payload + 4]))
+        elif kind == b"mdat":
+            seen_mdat = True
+        elif kind == b"moov" and moov is None:
+            moov = (payload, box_end)
+            faststart = not seen_mdat
+    if moov is None:
+        raise NotAVideo("moov box가 없습니다")
+    duration_us, tracks = _parse_moov(buf, *moov)
+    return Mp4Info(
+        major_brand=major_brand,
+        duration_us=duration_us,
+        faststart=faststart,
+        tracks=tracks,
+    )
+
+
+def parse_file(path: Path | str) -> Mp4Info:
+    """ffprobe 없이 mmap으로 ftyp/moov/trak만 읽어 트랙/코덱/길이(us)를 반환합니다."""
+    with open(path, "rb") as handle:
+        handle.seek(0, 2)
+        size = handle.tell()
+        if size < 8:
+            raise NotAVideo("파일이 너무 작습니다")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            try:
+                return _parse(mapped, size)
+            except (struct.error, IndexError) as exc:
+                raise NotAVideo(f"손상된 box 구조: {exc}") from exc
+
+
+def _other_container(head: bytes) -> str | None:
+    for signature, name in _OTHER_SIGNATURES:
+        if head.startswith(signature):
+            return name
+    # MPEG-TS는 188바이트마다 0x47 동기 바이트가 옵니다.
+    if len(head) >= 377 and head[0] == head[188] == head[376] == 0x47:
+        return "mpegts"
+    return None
+
+
+def is_valid_video(path: Path | str) -> bool:
+    """MP4/MOV는 프로세스 안에서 판단하고, 다른 컨테이너만 ffprobe로 확인합니다."""
+    try:
+        return parse_file(path).has_video
+    except NotAVideo:
+        pass
+    except OSError:
+        return False
+    try:
+        with open(path, "rb") as handle:
+            head = handle.read(512)
+    except OSError:
+        return False
+    if _other_container(head) is None:
+        return False
+    info = probe_media(path)
+    return bool(info and info.has_video)
+
+
+class StreamValidator:
+    """다운로드 중인 바이트를 순서대로 받아 영상이 아니면 바로 NotAVideo를 던집니다.
+
+    첫 box 헤더(8바이트)만으로 HTML 에러 페이지 같은 응답을 걸러내고, moov가 mdat보다
+    먼저 오면(faststart) 트랙까지 확인합니다. mdat 본문은 버퍼에 담지 않고 건너뜁니다.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._next_box = 0
+        self._boxes = 0
+        self._major_brand: str | None = None
+        self._seen_mdat = False
+        self.container: str | None = None
+        self.info: Mp4Info | None = None
+        self.done = False
+
+    def feed(self, data: bytes) -> None:
+        if self.done or not data:
+            return
+        self._buffer += data
+        while not self.done and self._step():
+            pass
+
+    def _step(self) -> bool:
+        skip = self._next_box - self._buffer_start
+        if skip > 0:
+            dropped = min(skip, len(self._buffer))
+            del self._buffer[:dropped]
+            self._buffer_start += dropped
+            if dropped < skip:
+                return False
+        if self._boxes == 0:
+            if self._buffer[:1] == b"\x47" and len(self._buffer) < 377:
+                return False
+            other = _other_container(bytes(self._buffer[:512]))
+            if other:
+                self.container = other
+                self.done = True
+                return False
+        parsed = _box_header(self._buffer, 0, len(self._buffer))
+        if parsed is None:
+            if len(self._buffer) >= 16:
+                self._reject()
+            return False
+        kind, payload, box_end = parsed
+        if (self._boxes == 0 and kind not in _FIRST_BOXES) or not _plausible_type(kind):
+            self._reject()
+        self.container = "mp4"
+        self._boxes += 1
+        if self._buffer[:4] == b"\x00\x00\x00\x00":
+            # 크기 0은 "파일 끝까지"라서 그 뒤로는 box 경계를 알 수 없습니다.
+            self.done = True
+            return False
+        if kind == b"ftyp" and len(self._buffer) >= payload + 4:
+            self._major_brand = _fourcc(bytes(self._buffer[payload : payload + 4]))
+        elif kind == b"mdat":
+            self._seen_mdat = True
+        elif kind == b"moov":
+            if box_end > MAX_STREAM_MOOV_BYTES:
+                self.done = True
+                return False
+            if len(self._buffer) < box_end:
+                self._boxes -= 1
+                return False
+            self._finish_moov(payload, box_end)
+            return False
+        self._next_box = self._buffer_start + box_end
+        return True
+
+    def _finish_moov(self, payload: int, box_end: int) -> None:
+        try:
+            duration_us, tracks = _parse_moov(self._buffer, payload, box_end)
+        except (struct.error, IndexError) as exc:
+            raise NotAVideo(f"손상된 moov: {exc}") from exc
+        self.info = Mp4Info(
+            major_brand=self._major_brand,
+            duration_us=duration_us,
+            faststart=not self._seen_mdat,
+            tracks=tracks,
+        )
+        self.done = True
+        if not self.info.has_video:
+            raise NotAVideo("비디오 트랙이 없습니다")
+
+    def _reject(self) -> None:
+        self.done = True
+        preview = bytes(self._buffer[:16])
+        raise NotAVideo(f"영상 응답이 아닙니다: {preview!r}")
+
+
+def stream_inspector():
+    """http_client.stream_to_file(make_inspector=...)에 넘길 새 검사 콜백."""
+    return StreamValidator().feed
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse MP4/MOV boxes without ffprobe")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for value in args.paths:
+        try:
+            info = parse_file(value)
+            payload = {**asdict(info), "has_video": info.has_video}
+        except (NotAVideo, OSError) as exc:
+            payload = {"error": str(exc)}
+        print(json.dumps({"path": value, "info": payload}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
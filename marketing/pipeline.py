@@ -2,7 +2,7 @@ from collector import collect_product
 from db_manager import DatabaseManager
 from trend_scanner import scan_trends
 from video_downloader import download_ready_products
-from video_processor import process_downloaded
+from video_processor import RenderBatchError, process_downloaded
 
 
 def run_pipeline(origin_url: str, title: str | None = None) -> None:
@@ -27,11 +27,17 @@ def run_auto_pipeline(count: int = 3) -> None:
         status = "OK" if result.success else "FAIL"
         print(f"DOWNLOAD {index}/{total} {status}: {result.origin_url}")
     product_ids = {result.product_id for result in results if result.success}
-    processed = process_downloaded(
-        limit=len(product_ids), track="AUTO", product_ids=product_ids
-    )
+    failures: list[tuple[str, str]] = []
+    try:
+        processed = process_downloaded(
+            limit=len(product_ids), track="AUTO", product_ids=product_ids
+        )
+    except RenderBatchError as exc:
+        processed, failures = exc.processed, exc.failures
     for index, path in enumerate(processed, start=1):
         print(f"PROCESS {index}/{len(processed)} OK: {path}")
+    for origin_url, message in failures:
+        print(f"PROCESS FAIL: {origin_url} ({message})")
 
 
 def main() -> None:
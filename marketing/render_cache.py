@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+RENDER_CACHE_DIR = CACHE_DIR / "render_cache"
+# 렌더 로직이 바뀌어 기존 결과를 무효화해야 할 때 올립니다.
+RENDER_CACHE_VERSION = 2
+_HASH_CHUNK = 4 * 1024 * 1024
+
+
+def _is_enabled() -> bool:
+    return os.getenv("RENDER_CACHE") != "0"
+
+
+def _atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _hash_memo_path(path: Path) -> Path:
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return RENDER_CACHE_DIR / "hashes" / f"{key}.json"
+
+
+def remember_hash(path: Path | str, sha256: str) -> None:
+    """다운로드하면서 이미 계산한 해시를 기록해 렌더 때 다시 읽지 않게 합니다."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return
+    _atomic_write_json(
+        _hash_memo_path(path),
+        {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256},
+    )
+
+
+def content_hash(path: Path | str) -> str | None:
+    """파일 내용의 sha256. 같은 path/size/mtime이면 이전 계산 결과를 재사용합니다."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    memo_path = _hash_memo_path(path)
+    memo = _read_json(memo_path)
+    if (
+        memo
+        and memo.get("size") == stat.st_size
+        and memo.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return memo.get("sha256")
+
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    value = digest.hexdigest()
+    _atomic_write_json(
+        memo_path,
+        {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": value},
+    )
+    return value
+
+
+def file_signature(path: Path | str | None) -> dict[str, Any] | None:
+    if not path:
+        return None
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return {"path": str(path), "missing": True}
+    return {"name": path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def render_fingerprint(raw_path: Path, **inputs: Any) -> str | None:
+    """원본 내용 해시와 자막/BGM/폰트/코덱 등 렌더 입력 전체를 합친 sha256."""
+    raw_hash = content_hash(raw_path)
+    if raw_hash is None:
+        return None
+    payload = {"version": RENDER_CACHE_VERSION, "raw": raw_hash, **inputs}
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _sidecar_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.name}.render.json")
+
+
+def _index_path(fingerprint: str) -> Path:
+    return RENDER_CACHE_DIR / f"{fingerprint}.json"
+
+
+def _copy_file(source: Path, target: Path) -> None:
+    # 하드링크로 공유하면 ffmpeg -y가 같은 inode를 덮어써 다른 상품의 결과물까지 바뀝니다.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_name(f".{target.name}.{threading.get_ident()}.copy")
+    shutil.copy2(source, tmp_target)
+    os.replace(tmp_target, target)
+
+
+def _matches(path: Path, entry: dict[str, Any]) -> bool:
+    """크기가 같고 내용 sha256까지 기록과 같아야 재사용합니다."""
+    try:
+        if path.stat().st_size != entry.get("size"):
+            return False
+    except OSError:
+        return False
+    return bool(entry.get("sha256")) and content_hash(path) == entry.get("sha256")
+
+
+def reuse_render(fingerprint: str | None, output_path: Path) -> bool:
+    """같은 fingerprint의 결과물이 있으면 output_path에 복사하고 True를 반환합니다."""
+    if not fingerprint or not _is_enabled():
+        return False
+
+    sidecar = _read_json(_sidecar_path(output_path))
+    if (
+        sidecar
+        and sidecar.get("fingerprint") == fingerprint
+        and _matches(output_path, sidecar)
+    ):
+        return True
+
+    entry = _read_json(_index_path(fingerprint))
+    if not entry:
+        return False
+    source = Path(entry.get("output") or "")
+    if not _matches(source, entry):
+        return False
+    if os.path.abspath(source) != os.path.abspath(output_path):
+        try:
+            _copy_file(source, output_path)
+        except OSError:
+            return False
+    record_render(fingerprint, output_path)
+    return True
+
+
+def record_render(fingerprint: str | None, output_path: Path) -> None:
+    if not fingerprint or not _is_enabled():
+        return
+    try:
+        size = output_path.stat().st_size
+    except OSError:
+        return
+    sha256 = content_hash(output_path)
+    if sha256 is None:
+        return
+    entry = {
+        "fingerprint": fingerprint,
+        "output": os.path.abspath(output_path),
+        "size": size,
+        "sha256": sha256,
+    }
+    _atomic_write_json(_sidecar_path(output_path), entry)
+    _atomic_write_json(_index_path(fingerprint), entry)
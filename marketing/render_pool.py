@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+
+DEFAULT_THREADS_PER_JOB = 4
+
+
+@dataclass
+class RenderVariant:
+    output_path: Path
+    top_text: str
+    bottom_text: str
+    context: dict[str, Any] = field(default_factory=dict)
+    thumbnail_path: Path | None = None
+    sprite_path: Path | None = None
+
+
+@dataclass
+class RenderJob:
+    """원본 하나에 대한 렌더 작업. variants가 여러 개면 한 번 디코드해 모두 출력합니다."""
+
+    key: str
+    input_path: Path
+    variants: list[RenderVariant]
+    context: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RenderResult:
+    job: RenderJob
+    outputs: list[Path]
+    success: bool
+    message: str
+    elapsed_sec: float
+
+
+def _env_int(key: str) -> int | None:
+    value = os.getenv(key)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def resolve_threads_per_job(threads: int | None = None) -> int:
+    if threads is None:
+        threads = _env_int("RENDER_THREADS")
+    return max(1, threads or DEFAULT_THREADS_PER_JOB)
+
+
+def resolve_worker_count(
+    workers: int | str | None = None, threads_per_job: int | None = None
+) -> int:
+    """워커 수를 결정합니다. "auto"이면 CPU 코어 수를 잡당 -threads 값으로 나눕니다."""
+    if workers is None:
+        workers = os.getenv("RENDER_WORKERS") or 1
+    if isinstance(workers, str):
+        if workers.strip().lower() == "auto":
+            cores = os.cpu_count() or 1
+            return max(1, cores // resolve_threads_per_job(threads_per_job))
+        try:
+            workers = int(workers)
+        except ValueError:
+            workers = 1
+    return max(1, workers)
+
+
+def resolve_job_timeout(timeout: float | None = None) -> float | None:
+    if timeout is not None:
+        return timeout if timeout > 0 else None
+    value = _env_int("RENDER_TIMEOUT_SEC")
+    return float(value) if value and value > 0 else None
+
+
+class RenderPool:
+    """ffmpeg 렌더 작업을 여러 워커로 병렬 실행하고 완료 순서대로 결과를 돌려줍니다."""
+
+    def __init__(
+        self,
+        render_fn: Callable[..., list[Path]],
+        workers: int | str | None = None,
+        threads_per_job: int | None = None,
+        timeout: float | None = None,
+        on_progress: Callable[[Any], None] | None = None,
+    ) -> None:
+        self.render_fn = render_fn
+        self.on_progress = on_progress
+        self.threads_per_job = resolve_threads_per_job(threads_per_job)
+        self.workers = resolve_worker_count(workers, self.threads_per_job)
+        self.timeout = resolve_job_timeout(timeout)
+
+    def _run_job(self, job: RenderJob) -> RenderResult:
+        started = time.monotonic()
+        try:
+            outputs = self.render_fn(
+                job.input_path,
+                job.variants,
+                threads=self.threads_per_job,
+                timeout=self.timeout,
+                on_progress=self.on_progress,
+            )
+            return RenderResult(
+                job=job,
+                outputs=outputs,
+                success=True,
+                message="rendered",
+                elapsed_sec=time.monotonic() - started,
+            )
+        except Exception as exc:
+            return RenderResult(
+                job=job,
+                outputs=[],
+                success=False,
+                message=str(exc) or exc.__class__.__name__,
+                elapsed_sec=time.monotonic() - started,
+            )
+
+    def imap(self, jobs: Iterable[RenderJob]) -> Iterator[RenderResult]:
+        """작업을 워커 수만큼만 미리 제출하고, 끝나는 대로 결과를 yield 합니다."""
+        job_iter = iter(jobs)
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="render"
+        ) as executor:
+            pending: set[Future] = set()
+
+            def _fill() -> None:
+                while len(pending) < self.workers:
+                    try:
+                        job = next(job_iter)
+                    except StopIteration:
+                        return
+                    pending.add(executor.submit(self._run_job, job))
+
+            _fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield future.result()
+                _fill()
+
+    def run(self, jobs: Iterable[RenderJob]) -> list[RenderResult]:
+        return list(self.imap(jobs))
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+MARKETING_DIR = Path(__file__).resolve().parents[1]
+BACKENDS = ("moviepy", "ffmpeg")
+
+
+def _peak_rss_mb(who: int) -> float | None:
+    if resource is None:
+        return None
+    value = resource.getrusage(who).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위입니다.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(value / divisor, 1)
+
+
+def _run_worker(backend: str, input_path: Path, workdir: Path) -> None:
+    """한 백엔드로 파일 하나를 가공하고 측정값을 JSON 한 줄로 출력합니다."""
+    sys.path.insert(0, str(MARKETING_DIR))
+    from main import VideoMonetizer
+
+    os.chdir(workdir)
+    monetizer = VideoMonetizer(input_dir=str(input_path.parent), output_dir=str(workdir))
+    bgm_path = str(MARKETING_DIR / "video_bgm" / "bgm.mp3")
+
+    started = time.perf_counter()
+    output = monetizer.process_file(input_path.name, bgm_path, backend=backend)
+    elapsed = time.perf_counter() - started
+
+    children = None if resource is None else resource.RUSAGE_CHILDREN
+    print(
+        "BENCH_RESULT "
+        + json.dumps(
+            {
+                "backend": backend,
+                "ok": output is not None,
+                "wall_sec": round(elapsed, 2),
+                "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+                # ffmpeg 백엔드는 인코딩이 자식 프로세스에서 일어나므로 따로 봅니다.
+                "children_peak_rss_mb": _peak_rss_mb(children) if resource else None,
+            }
+        ),
+        flush=True,
+    )
+
+
+def _spawn(backend: str, input_path: Path) -> dict | None:
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{backend}_"))
+    try:
+        result = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--worker",
+                backend,
+                str(input_path),
+                "--workdir",
+                str(workdir),
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            check=False,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line.split(" ", 1)[1])
+    print(result.stdout[-2000:])
+    print(result.stderr[-2000:])
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="VideoMonetizer MoviePy/ffmpeg 백엔드 벽시계 시간과 최대 RSS 비교"
+    )
+    parser.add_argument("input", nargs="?", help="벤치마크할 mp4 파일")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not args.input:
+        parser.error("input 파일을 지정하세요.")
+    input_path = Path(args.input).resolve()
+
+    if args.worker:
+        _run_worker(args.worker, input_path, Path(args.workdir or os.getcwd()))
+        return
+
+    # 백엔드마다 새 프로세스에서 돌려야 RSS 최대값이 서로 섞이지 않습니다.
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        for attempt in range(1, max(1, args.repeat) + 1):
+            result = _spawn(backend, input_path)
+            if result is None:
+                print(f"❌ {backend} #{attempt}: 실패")
+                continue
+            print(
+                f"{backend:8s} #{attempt} ok={result['ok']} "
+                f"wall={result['wall_sec']}s "
+                f"rss={result['peak_rss_mb']}MB "
+                f"children_rss={result['children_peak_rss_mb']}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
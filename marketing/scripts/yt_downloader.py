@@ -1,37 +1,159 @@
+import copy
 import os
+import queue
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable, List
 
 from moviepy.editor import VideoFileClip
 from moviepy.video.fx.all import crop
-from yt_dlp import YoutubeDL
 from yt_dlp.utils import DownloadError
 
 
+import http_client
+import ytdlp_cache
 from storage_paths import DOWNLOADS_DIR, PROCESSED_DIR, ensure_storage_dirs
 
 
+_STOP = object()
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key) or default))
+    except ValueError:
+        return default
+
+
+class _DiskBudget:
+    """다운로드는 끝났지만 아직 크롭되지 않은 원본의 총 크기를 제한합니다."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.pending = 0
+        self._cond = threading.Condition()
+
+    def wait_for_room(self) -> None:
+        with self._cond:
+            # 한도를 넘으면 크롭 워커가 원본을 지울 때까지 새 다운로드를 멈춥니다.
+            while self.pending >= self.max_bytes:
+                self._cond.wait()
+
+    def add(self, size: int) -> None:
+        with self._cond:
+            self.pending += size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self.pending = max(0, self.pending - size)
+            self._cond.notify_all()
+
+
 class BatchVideoDownloader:
     def __init__(
         self,
         download_dir: str | None = None,
         processed_dir: str | None = None,
+        download_workers: int | None = None,
+        crop_workers: int | None = None,
+        max_pending_mb: int | None = None,
     ) -> None:
         ensure_storage_dirs()
         self.download_dir = Path(download_dir) if download_dir else DOWNLOADS_DIR
         self.processed_dir = Path(processed_dir) if processed_dir else PROCESSED_DIR
         self.download_dir.mkdir(parents=True, exist_ok=True)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
-        self.concurrency = 1
+        self.concurrency = download_workers or _env_int("BATCH_DOWNLOAD_WORKERS", 2)
+        self.crop_workers = crop_workers or _env_int("BATCH_CROP_WORKERS", 1)
+        self.max_pending_bytes = (
+            max_pending_mb or _env_int("BATCH_MAX_PENDING_MB", 2048)
+        ) * 1024 * 1024
+        # 마지막 download_all에서 실패한 (url, 오류) 목록
+        self.failures: list[tuple[str, BaseException]] = []
 
     def download_all(self, urls: Iterable[str]) -> List[Path]:
-        results: List[Path] = []
-        for index, url in enumerate(urls, 1):
-            results.append(self._download_and_process_sync(url, index))
-        return results
+        """다운로드 워커 N개가 큐를 채우고 크롭 워커 M개가 비우는 파이프라인.
 
-    def _download_and_process_sync(self, url: str, index: int) -> Path:
+        성공한 결과만 입력 순서대로 반환하고, 실패는 self.failures에 (url, 오류)로 남깁니다.
+        """
+        items = list(enumerate(urls, 1))
+        self.failures = []
+        if not items:
+            return []
+
+        url_queue: queue.Queue = queue.Queue()
+        for item in items:
+            url_queue.put(item)
+        crop_queue: queue.Queue = queue.Queue(maxsize=self.crop_workers * 2)
+        budget = _DiskBudget(self.max_pending_bytes)
+        results: dict[int, Path] = {}
+        errors: dict[int, BaseException] = {}
+        lock = threading.Lock()
+        encode_threads = max(1, (os.cpu_count() or 4) // self.crop_workers)
+
+        def _download_worker() -> None:
+            while True:
+                try:
+                    index, url = url_queue.get_nowait()
+                except queue.Empty:
+                    return
+                budget.wait_for_room()
+                try:
+                    download_path = self._download(url, index)
+                except Exception as error:
+                    with lock:
+                        errors[index] = error
+                    continue
+                size = download_path.stat().st_size if download_path.exists() else 0
+                budget.add(size)
+                crop_queue.put((index, download_path, size))
+
+        def _crop_worker() -> None:
+            while True:
+                item = crop_queue.get()
+                if item is _STOP:
+                    return
+                index, download_path, size = item
+                try:
+                    processed_path = self.processed_dir / download_path.name
+                    self._crop_and_save(download_path, processed_path, encode_threads)
+                    with lock:
+                        results[index] = processed_path
+                except Exception as error:
+                    with lock:
+                        errors[index] = error
+                finally:
+                    if download_path.exists():
+                        download_path.unlink()
+                    budget.release(size)
+
+        downloaders = [
+            threading.Thread(target=_download_worker, name=f"yt-download-{i}")
+            for i in range(min(self.concurrency, len(items)))
+        ]
+        croppers = [
+            threading.Thread(target=_crop_worker, name=f"yt-crop-{i}")
+            for i in range(self.crop_workers)
+        ]
+        for thread in downloaders + croppers:
+            thread.start()
+        for thread in downloaders:
+            thread.join()
+        for _ in croppers:
+            crop_queue.put(_STOP)
+        for thread in croppers:
+            thread.join()
+        ytdlp_cache.close_all()
+
+        for index, url in items:
+            if index in errors:
+                print(f"DOWNLOAD_FAILED {url}: {errors[index]}")
+                self.failures.append((url, errors[index]))
+        print(f"HTTP_METRICS {http_client.metrics()}")
+        return [results[index] for index, _ in items if index in results]
+
+    def _download(self, url: str, index: int) -> Path:
         if not self._is_valid_video_url(url):
             raise ValueError(f"Unsupported or invalid URL: {url}")
 
@@ -39,8 +161,7 @@ class BatchVideoDownloader:
         filename = f"video_{timestamp}_{index}.mp4"
         download_path = self.download_dir / filename
 
-        ydl_opts = {
-            "outtmpl": str(download_path),
+        extract_opts = {
             "format": "mp4/bestvideo+bestaudio/best",
             "merge_output_format": "mp4",
             "quiet": False,
@@ -57,21 +178,37 @@ class BatchVideoDownloader:
             },
         }
 
+        # 파일명은 info 필드로 넘겨서 같은 옵션의 YoutubeDL을 스레드마다 재사용합니다.
+        download_opts = {
+            **extract_opts,
+            "outtmpl": str(self.download_dir / "%(shorts_filename)s"),
+            "merge_output_format": "mp4",
+        }
+        cached = ytdlp_cache.is_fresh(url, extract_opts)
         try:
-            with YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            info = ytdlp_cache.extract_info(url, extract_opts)
+            try:
+                self._download_info(info, filename, download_opts)
+            except DownloadError:
+                if not cached:
+                    raise
+                # 캐시된 서명 URL이 만료됐을 수 있으니 한 번 새로 추출합니다.
+                info = ytdlp_cache.extract_info(url, extract_opts, refresh=True)
+                self._download_info(info, filename, download_opts)
         except DownloadError as error:
             raise RuntimeError(f"Download failed for {url}: {error}") from error
 
-        processed_path = self.processed_dir / filename
-        self._crop_and_save(download_path, processed_path)
+        return download_path
 
-        if download_path.exists():
-            download_path.unlink()
-
-        return processed_path
+    @staticmethod
+    def _download_info(info: dict | None, filename: str, download_opts: dict) -> None:
+        if not info:
+            raise DownloadError("No video info extracted")
+        info = copy.deepcopy(info)
+        info["shorts_filename"] = filename
+        ytdlp_cache.get_ydl(download_opts).process_ie_result(info, download=True)
 
-    def _crop_and_save(self, src: Path, dst: Path) -> None:
+    def _crop_and_save(self, src: Path, dst: Path, threads: int | None = None) -> None:
         with VideoFileClip(str(src)) as clip:
             width, height = clip.size
             crop_x = int(width * 0.10)
@@ -87,7 +224,7 @@ class BatchVideoDownloader:
                 str(dst),
                 codec="libx264",
                 audio_codec="aac",
-                threads=os.cpu_count() or 4,
+                threads=threads or os.cpu_count() or 4,
                 logger=None,
             )
 
@@ -111,6 +248,11 @@ def main() -> None:
     results = downloader.download_all(urls)
     for result in results:
         print(f"Saved: {result}")
+    if downloader.failures:
+        for url, error in downloader.failures:
+            print(f"Failed: {url} ({error})")
+        # 일부만 실패해도 CI/cron이 알 수 있게 0이 아닌 코드로 끝냅니다.
+        raise SystemExit(f"{len(downloader.failures)}/{len(urls)} downloads failed")
 
 
 if __name__ == "__main__":
@@ -3,8 +3,8 @@ from typing import Iterable
 from urllib.parse import quote_plus
 
 from deep_translator import GoogleTranslator
-from yt_dlp import YoutubeDL
 
+import ytdlp_cache
 from db_manager import DatabaseManager
 
 
@@ -62,16 +62,15 @@ def find_youtube_short_video_url(queries: Iterable[str]) -> str | None:
         "skip_download": True,
         "extract_flat": False,
     }
-    with YoutubeDL(ydl_opts) as ydl:
-        for query in queries:
-            info = ydl.extract_info(f"ytsearch1:{query}", download=False)
-            entries = info.get("entries") or []
-            if not entries:
-                continue
-            first = entries[0]
-            video_url = _pick_mp4_url(first)
-            if video_url:
-                return video_url
+    for query in queries:
+        info = ytdlp_cache.extract_info(f"ytsearch1:{query}", ydl_opts)
+        entries = (info or {}).get("entries") or []
+        if not entries:
+            continue
+        first = entries[0]
+        video_url = _pick_mp4_url(first)
+        if video_url:
+            return video_url
     return None
 
 
@@ -89,18 +88,9 @@ def find_dailymotion_video_url(queries: Iterable[str]) -> str | None:
 
 
 def _fetch_search_page(url: str) -> str:
-    import requests
+    import http_client
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    response = requests.get(url, headers=headers, timeout=15)
-    response.raise_for_status()
-    return response.text
+    return http_client.fetch_text(url, timeout=15)
 
 
 def _extract_tiktok_urls(html: str) -> list[str]:
@@ -3,9 +3,10 @@ import re
 from pathlib import Path
 from typing import Any
 
-import requests
 from deep_translator import GoogleTranslator
 
+import blob_store
+import http_client
 from db_manager import DatabaseManager
 from video_processor import process_stock_video
 from storage_paths import RAW_DIR, PROCESSED_DIR, ensure_storage_dirs
@@ -72,14 +73,12 @@ def download_stock_video(keyword: str) -> Path:
     if not api_key:
         raise RuntimeError("PEXELS_API_KEY 환경 변수가 필요합니다.")
 
-    response = requests.get(
+    data = http_client.fetch_json(
         "https://api.pexels.com/videos/search",
         params={"query": keyword, "per_page": 10, "orientation": "portrait"},
         headers={"Authorization": api_key},
         timeout=30,
     )
-    response.raise_for_status()
-    data = response.json()
     video = _pick_vertical_video(data.get("videos", []))
     if not video:
         raise RuntimeError("세로형 스톡 영상을 찾지 못했습니다.")
@@ -88,12 +87,7 @@ def download_stock_video(keyword: str) -> Path:
         raise RuntimeError("다운로드 가능한 video_files 링크가 없습니다.")
 
     target_path = RAW_DIR / f"{_sanitize_name(keyword)}.mp4"
-    with requests.get(file_url, stream=True, timeout=60) as download:
-        download.raise_for_status()
-        with open(target_path, "wb") as handle:
-            for chunk in download.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
+    blob_store.download(file_url, target_path, timeout=60)
     return target_path
 
 
@@ -132,10 +126,7 @@ def main() -> None:
             raw_path = download_stock_video(keyword)
             renamed_raw = RAW_DIR / f"{base_name}.mp4"
             if renamed_raw != raw_path:
-                if renamed_raw.exists():
-                    renamed_raw.unlink()
-                raw_path.rename(renamed_raw)
-                raw_path = renamed_raw
+                raw_path = blob_store.move(raw_path, renamed_raw)
             output_path = PROCESSED_DIR / f"{base_name}_final.mp4"
             processed = process_stock_video(
                 raw_path,
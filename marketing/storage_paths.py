@@ -19,6 +19,10 @@ TEST_ASSETS_DIR = _resolve_path(os.getenv("TEST_ASSETS_DIR"), STORAGE_ROOT / "te
 UPLOADS_DIR = _resolve_path(os.getenv("UPLOADS_DIR"), STORAGE_ROOT / "uploads")
 DOWNLOADS_DIR = _resolve_path(os.getenv("DOWNLOADS_DIR"), STORAGE_ROOT / "downloads")
 LOGS_DIR = _resolve_path(os.getenv("LOGS_DIR"), STORAGE_ROOT / "logs")
+CACHE_DIR = _resolve_path(os.getenv("CACHE_DIR"), STORAGE_ROOT / "cache")
+THUMBNAILS_DIR = _resolve_path(os.getenv("THUMBNAILS_DIR"), STORAGE_ROOT / "thumbnails")
+SCRATCH_DIR = _resolve_path(os.getenv("SCRATCH_DIR"), STORAGE_ROOT / "scratch")
+BLOBS_DIR = _resolve_path(os.getenv("BLOBS_DIR"), STORAGE_ROOT / "blobs")
 
 
 def ensure_storage_dirs() -> None:
@@ -30,5 +34,9 @@ def ensure_storage_dirs() -> None:
         UPLOADS_DIR,
         DOWNLOADS_DIR,
         LOGS_DIR,
+        CACHE_DIR,
+        THUMBNAILS_DIR,
+        SCRATCH_DIR,
+        BLOBS_DIR,
     ):
         path.mkdir(parents=True, exist_ok=True)
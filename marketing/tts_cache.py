@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+TTS_CACHE_DIR = CACHE_DIR / "tts"
+DEFAULT_ENGINE = "gtts"
+DEFAULT_MAX_MB = 200
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _max_bytes() -> int:
+    try:
+        max_mb = float(os.getenv("TTS_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+    except ValueError:
+        max_mb = DEFAULT_MAX_MB
+    return int(max_mb * 1024 * 1024)
+
+
+def _cache_path(text: str, lang: str, engine: str) -> Path:
+    payload = json.dumps(
+        {"text": text, "lang": lang, "engine": engine}, ensure_ascii=False
+    )
+    key = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return TTS_CACHE_DIR / f"{key}.mp3"
+
+
+def _synthesize(text: str, lang: str, engine: str, target: Path) -> None:
+    if engine != "gtts":
+        raise ValueError(f"지원하지 않는 TTS 엔진입니다: {engine}")
+    from gtts import gTTS
+
+    gTTS(text=text, lang=lang).save(str(target))
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _stats[key] += 1
+
+
+def _evict(keep: Path) -> None:
+    """캐시 전체 크기가 한도를 넘으면 가장 오래 쓰지 않은 파일부터 지웁니다."""
+    limit = _max_bytes()
+    entries = []
+    total = 0
+    for path in TTS_CACHE_DIR.glob("*.mp3"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total += stat.st_size
+    if total <= limit:
+        return
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        _count("evictions")
+
+
+def synthesize(text: str, lang: str = "ko", engine: str = DEFAULT_ENGINE) -> Path:
+    """(text, lang, engine)별로 합성 음성을 디스크에 캐시하고 경로를 반환합니다."""
+    path = _cache_path(text, lang, engine)
+    if path.exists():
+        _count("hits")
+        try:
+            # mtime을 최근 사용 시각으로 써서 LRU 순서를 유지합니다.
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    _count("misses")
+    TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(
+        f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        _synthesize(text, lang, engine, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    _evict(keep=path)
+    return path
+
+
+def synthesize_to(
+    text: str,
+    filename: str | os.PathLike,
+    lang: str = "ko",
+    engine: str = DEFAULT_ENGINE,
+) -> Path:
+    source = synthesize(text, lang, engine)
+    shutil.copyfile(source, filename)
+    return Path(filename)
+
+
+def prefetch(
+    texts: Iterable[str],
+    lang: str = "ko",
+    engine: str = DEFAULT_ENGINE,
+    workers: int = 4,
+) -> int:
+    """렌더 전에 여러 문장을 병렬로 미리 합성합니다. 실패한 문장은 렌더 때 다시 시도됩니다."""
+    unique = list(dict.fromkeys(text for text in texts if text))
+    if not unique:
+        return 0
+
+    def _fetch(text: str) -> bool:
+        try:
+            synthesize(text, lang, engine)
+            return True
+        except Exception as exc:
+            print(f"⚠️ TTS 미리 합성 실패: {exc}")
+            return False
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, workers), thread_name_prefix="tts"
+    ) as executor:
+        return sum(executor.map(_fetch, unique))
+
+
+def cache_stats() -> dict[str, int]:
+    with _lock:
+        return dict(_stats)
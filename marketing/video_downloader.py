@@ -1,16 +1,21 @@
 import os
 import re
 import shutil
-import subprocess
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
-import requests
-
 from datetime import datetime
 
+import blob_store
+import dedup_index
+import http_client
+import mp4_probe
+import ytdlp_cache
 from db_manager import DatabaseManager
+from download_pool import DownloadPool
+from render_cache import content_hash
 from storage_paths import (
     DOWNLOADS_DIR,
     IMPORTS_DIR,
@@ -28,6 +33,9 @@ ECOMMERCE_HOSTS = (
     "jd.com",
     "yangkeduo.com",
 )
+_fallback_lock = threading.Lock()
+_reserve_lock = threading.Lock()
+_reserved_paths: set[Path] = set()
 _deno_path = Path.home() / ".deno" / "bin"
 if _deno_path.exists():
     os.environ["PATH"] = f"{_deno_path}{os.pathsep}{os.environ.get('PATH','')}"
@@ -43,16 +51,7 @@ class DownloadResult:
 
 
 def _fetch_page(url: str) -> str:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    response = requests.get(url, headers=headers, timeout=20)
-    response.raise_for_status()
-    return response.text
+    return http_client.fetch_text(url, timeout=20)
 
 
 def _extract_mp4_urls(html: str) -> list[str]:
@@ -64,41 +63,22 @@ def _extract_mp4_urls(html: str) -> list[str]:
     return deduped
 
 
-def _download_file(url: str, target_path: Path) -> None:
-    with requests.get(url, stream=True, timeout=30) as response:
-        response.raise_for_status()
-        with open(target_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
+def _download_file(
+    url: str, target_path: Path, headers: dict[str, str] | None = None
+) -> None:
+    # 큰 파일은 http_client가 여러 연결로 나눠 받고, 내용은 blob 저장소에 한 번만 둡니다.
+    # 영상이 아닌 응답(HTML 에러 페이지 등)은 앞부분 몇 KB만 보고 중단합니다.
+    blob_store.download(
+        url,
+        target_path,
+        headers=headers,
+        timeout=30,
+        make_inspector=mp4_probe.stream_inspector,
+    )
 
 
 def _is_valid_video(path: Path) -> bool:
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-select_streams",
-                "v:0",
-                "-show_entries",
-                "stream=codec_type",
-                "-of",
-                "default=nw=1",
-                str(path),
-            ],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="ignore",
-            check=False,
-        )
-        if result.returncode != 0:
-            return False
-        return "codec_type=video" in (result.stdout or "")
-    except Exception:
-        return False
+    return mp4_probe.is_valid_video(path)
 
 
 def _get_fallback_pool() -> list[Path]:
@@ -111,11 +91,12 @@ def _get_fallback_pool() -> list[Path]:
 
 
 def _fallback_copy(target_path: Path, pool: list[Path]) -> bool:
-    if not pool:
-        return False
-    source = pool.pop(0)
+    with _fallback_lock:
+        if not pool:
+            return False
+        source = pool.pop(0)
+        pool.append(source)
     shutil.copyfile(source, target_path)
-    pool.append(source)
     return True
 
 
@@ -175,33 +156,28 @@ def _build_filename(title: str) -> str:
     return f"{safe_title}.mp4"
 
 
-def _pick_mp4_from_info(info: dict) -> str | None:
+def _pick_mp4_from_info(info: dict) -> tuple[str, dict[str, str]] | None:
+    """mp4 URL과 yt-dlp가 해당 포맷에 요구하는 HTTP 헤더를 함께 반환합니다."""
     formats = info.get("formats") or []
     for fmt in formats:
         url = fmt.get("url")
         if not url:
             continue
         if fmt.get("ext") == "mp4" or ".mp4" in url:
-            return url
+            return url, fmt.get("http_headers") or info.get("http_headers") or {}
     url = info.get("url")
     if url and (info.get("ext") == "mp4" or ".mp4" in url):
-        return url
+        return url, info.get("http_headers") or {}
     return None
 
 
 def _download_with_ytdlp(origin_url: str, target_path: Path) -> bool:
     if "aliexpress.com" in origin_url:
         return False
-    try:
-        import yt_dlp
-    except Exception:
-        return False
 
-    output_template = str(target_path)
+    # 실제 다운로드는 http_client/blob_store가 하므로 yt-dlp는 URL 해석에만 씁니다.
     ydl_opts = {
-        "outtmpl": output_template,
         "format": "best[ext=mp4]/best",
-        "merge_output_format": "mp4",
         "quiet": True,
         "noprogress": True,
         "no_warnings": True,
@@ -209,78 +185,129 @@ def _download_with_ytdlp(origin_url: str, target_path: Path) -> bool:
         "youtube_include_dash_manifest": False,
         "extractor_args": {"youtube": {"player_client": ["android"]}},
     }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(origin_url, download=False)
+    for refresh in (False, True):
+        cached = not refresh and ytdlp_cache.is_fresh(origin_url, ydl_opts)
+        try:
+            info = ytdlp_cache.extract_info(origin_url, ydl_opts, refresh=refresh)
+            if not info:
+                return False
             if "entries" in info:
                 entries = info.get("entries") or []
                 if not entries:
                     return False
                 info = entries[0]
-            mp4_url = _pick_mp4_from_info(info)
-            if not mp4_url:
+            picked = _pick_mp4_from_info(info)
+            if not picked:
                 return False
-            _download_file(mp4_url, target_path)
-        if not target_path.exists():
-            return False
-        if target_path.stat().st_size == 0 or not _is_valid_video(target_path):
-            target_path.unlink(missing_ok=True)
-            return False
-        return True
-    except Exception:
-        return False
+            mp4_url, http_headers = picked
+            _download_file(mp4_url, target_path, headers=http_headers)
+            if not target_path.exists():
+                return False
+            if not _is_valid_video(target_path):
+                blob_store.release(target_path)
+                return False
+            return True
+        except Exception:
+            # 캐시된 서명 URL이 예상보다 일찍 만료됐을 수 있으니 한 번만 새로 해석합니다.
+            if not cached:
+                return False
+            ytdlp_cache.invalidate(origin_url, ydl_opts)
+    return False
 
 
 def _resolve_target_path(title: str) -> Path:
     base_name = _build_filename(title)
     target_path = RAW_DIR / base_name
-    if not target_path.exists():
-        return target_path
-    stem = target_path.stem
-    for index in range(2, 50):
-        candidate = RAW_DIR / f"{stem}_{index}.mp4"
-        if not candidate.exists():
-            return candidate
+    # 동시에 받는 같은 제목의 상품이 같은 파일명을 고르지 않도록 예약해 둡니다.
+    with _reserve_lock:
+        if not target_path.exists() and target_path not in _reserved_paths:
+            _reserved_paths.add(target_path)
+            return target_path
+        stem = target_path.stem
+        for index in range(2, 50):
+            candidate = RAW_DIR / f"{stem}_{index}.mp4"
+            if not candidate.exists() and candidate not in _reserved_paths:
+                _reserved_paths.add(candidate)
+                return candidate
     return target_path
 
 
+def _release_target_path(target_path: Path) -> None:
+    # 파일이 생겼으면 exists()가 이름을 지키므로 예약은 다운로드가 끝나면 풉니다.
+    with _reserve_lock:
+        _reserved_paths.discard(target_path)
+
+
 def download_for_product(product, fallback_pool: list[Path]) -> Path | None:
     target_path = _resolve_target_path(product.title or "상품")
-    if _is_test_mode():
-        if _test_copy(target_path):
-            return target_path
-        return None
-    origin_url = (product.origin_url or "").lower()
-    if any(host in origin_url for host in ECOMMERCE_HOSTS):
-        from social_video_hunter import find_social_video_url
-
-        social_url = find_social_video_url(product.title or "product")
-        if social_url:
-            if _download_with_ytdlp(social_url, target_path):
+    try:
+        if _is_test_mode():
+            if _test_copy(target_path):
                 return target_path
             return None
-        return None
+        origin_url = (product.origin_url or "").lower()
+        if any(host in origin_url for host in ECOMMERCE_HOSTS):
+            from social_video_hunter import find_social_video_url
+
+            social_url = find_social_video_url(product.title or "product")
+            if social_url:
+                if _download_with_ytdlp(social_url, target_path):
+                    return target_path
+                return None
+            return None
 
-    if _download_with_ytdlp(product.origin_url, target_path):
-        return target_path
+        if _download_with_ytdlp(product.origin_url, target_path):
+            return target_path
 
-    try:
-        html = _fetch_page(product.origin_url)
-        mp4_urls = _extract_mp4_urls(html)
-        if mp4_urls:
-            _download_file(mp4_urls[0], target_path)
+        try:
+            html = _fetch_page(product.origin_url)
+            mp4_urls = _extract_mp4_urls(html)
+            if mp4_urls:
+                _download_file(mp4_urls[0], target_path)
+                if _is_valid_video(target_path):
+                    return target_path
+                blob_store.release(target_path)
+        except Exception:
+            pass
+
+        if _fallback_copy(target_path, fallback_pool):
             return target_path
-    except Exception:
-        pass
 
-    if _fallback_copy(target_path, fallback_pool):
-        return target_path
+        return None
+    finally:
+        _release_target_path(target_path)
 
-    return None
+
+def _download_and_fingerprint(
+    product, fallback_pool: list[Path]
+) -> tuple[Path, list[int] | None] | None:
+    raw_path = download_for_product(product, fallback_pool)
+    if not raw_path:
+        return None
+    # 지문 계산(ffmpeg 디코드)은 다운로드 워커에서 끝내 둡니다.
+    return raw_path, dedup_index.fingerprint_video(raw_path)
+
+
+def _reject_near_duplicate(
+    manager, product, raw_path: Path, frame_hashes
+) -> str | None:
+    duplicate = dedup_index.check_and_register(
+        manager, product, raw_path, frame_hashes, content_hash(raw_path)
+    )
+    if not duplicate:
+        return None
+    manager.update_product_status_by_id(product.id, "DUPLICATE")
+    blob_store.release(raw_path)
+    return (
+        f"near duplicate of {duplicate.product_id or duplicate.source_url} "
+        f"(match={duplicate.match_ratio:.2f}, dist={duplicate.mean_distance:.1f})"
+    )
 
 
 def download_ready_products(
-    limit: int | None = None, track: str | None = None
+    limit: int | None = None,
+    track: str | None = None,
+    workers: int | None = None,
 ) -> Iterable[DownloadResult]:
     manager = DatabaseManager()
     if track:
@@ -298,10 +325,33 @@ def download_ready_products(
     if limit is not None:
         products = products[:limit]
 
+    pool = DownloadPool(
+        lambda product: _download_and_fingerprint(product, fallback_pool),
+        lambda product: product.origin_url,
+        workers=workers,
+    )
     results: list[DownloadResult] = []
-    for product in products:
-        raw_path = download_for_product(product, fallback_pool)
-        if raw_path:
+    # 상태 업데이트는 DB 세션을 공유하지 않도록 메인 스레드에서 완료 순서대로 처리합니다.
+    for outcome in pool.imap(products):
+        product = outcome.item
+        raw_path, frame_hashes = outcome.result or (None, None)
+        # 렌더 전에 근접 중복(재인코딩된 같은 영상)을 걸러 인코딩/업로드 할당량을 아낍니다.
+        duplicate_message = (
+            _reject_near_duplicate(manager, product, raw_path, frame_hashes)
+            if raw_path
+            else None
+        )
+        if duplicate_message:
+            results.append(
+                DownloadResult(
+                    product_id=str(product.id),
+                    origin_url=product.origin_url,
+                    raw_path=None,
+                    success=False,
+                    message=duplicate_message,
+                )
+            )
+        elif raw_path:
             manager.update_product_status_by_id(product.id, "DOWNLOADED")
             results.append(
                 DownloadResult(
@@ -320,9 +370,11 @@ def download_ready_products(
                     origin_url=product.origin_url,
                     raw_path=None,
                     success=False,
-                    message="no video found",
+                    message=str(outcome.error) if outcome.error else "no video found",
                 )
             )
+    ytdlp_cache.close_all()
+    print(f"HTTP_METRICS {http_client.metrics()}")
     return results
 
 
@@ -1,29 +1,65 @@
 import os
 import random
 import shutil
-import subprocess
-from sqlalchemy import select
 from pathlib import Path
 import textwrap
 
+import blob_store
+from bgm_library import BgmAsset, get_bgm_library
+from caption_layers import CaptionLayer, render_caption_layer
 from db_manager import DatabaseManager
-from models import Channel, PipelineStatus, VideoAsset
-from storage_paths import PROCESSED_DIR, RAW_DIR, ensure_storage_dirs
+from ffmpeg_progress import ProgressCallback, run_ffmpeg
+from filter_preflight import (
+    synthetic_audio_input,
+    synthetic_av_input,
+    validate_filter_graph,
+)
+from media_probe import probe_media
+from models import Channel, PipelineStatus
+from render_cache import (
+    file_signature,
+    record_render,
+    render_fingerprint,
+    reuse_render,
+)
+from render_pool import (
+    RenderJob,
+    RenderPool,
+    RenderVariant,
+    resolve_threads_per_job,
+)
+from storage_paths import (
+    PROCESSED_DIR,
+    RAW_DIR,
+    THUMBNAILS_DIR,
+    ensure_storage_dirs,
+)
 
 
 ensure_storage_dirs()
 
 
-def _pick_bgm_path() -> Path | None:
-    candidates = []
-    bgm_dir = Path("video_bgm")
-    if bgm_dir.exists():
-        candidates.extend(bgm_dir.glob("*.mp3"))
-        candidates.extend(bgm_dir.glob("*.wav"))
-    return candidates[0] if candidates else None
+class CaptionPreflightFailed(RuntimeError):
+    """자막 레이어가 filter preflight를 통과하지 못해 렌더를 중단했습니다."""
 
 
-def _pick_cta_text() -> str:
+class RenderBatchError(RuntimeError):
+    """배치의 일부 렌더가 실패했습니다. 성공한 결과는 processed에 남아 있습니다."""
+
+    def __init__(self, processed: list[Path], failures: list[tuple[str, str]]) -> None:
+        super().__init__(f"{len(failures)} render job(s) failed")
+        self.processed = processed
+        self.failures = failures
+
+
+def _choose(options: list[str], seed: str | None = None) -> str:
+    # seed가 있으면 같은 상품은 항상 같은 문구를 받아 렌더 캐시가 유지됩니다.
+    if seed is None:
+        return random.choice(options)
+    return random.Random(seed).choice(options)
+
+
+def _pick_cta_text(seed: str | None = None) -> str:
     options = [
         "품절주의! 프로필 링크 클릭",
         "지금 안 사면 손해! 프로필 링크",
@@ -31,10 +67,10 @@ def _pick_cta_text() -> str:
         "오늘만 특가! 프로필 링크 클릭",
         "인기 폭발! 프로필 링크 확인",
     ]
-    return random.choice(options)
+    return _choose(options, seed)
 
 
-def _pick_cta_text_by_tone(tone: str) -> str:
+def _pick_cta_text_by_tone(tone: str, seed: str | None = None) -> str:
     tone = (tone or "INFORMAL").upper()
     if tone == "FORMAL":
         options = [
@@ -54,7 +90,7 @@ def _pick_cta_text_by_tone(tone: str) -> str:
             "지금 안 사면 손해! 프로필 링크",
             "핵가성비! 프로필 링크 확인",
         ]
-    return random.choice(options)
+    return _choose(options, seed)
 
 
 def _get_font_path() -> str | None:
@@ -67,15 +103,6 @@ def _get_font_path() -> str | None:
     return None
 
 
-def _escape_drawtext(text: str) -> str:
-    return (
-        text.replace("\\", "\\\\")
-        .replace(":", "\\:")
-        .replace("'", "\\'")
-        .replace("\n", "\\n")
-    )
-
-
 def _clean_text(text: str) -> str:
     cleaned = text.replace("\\n", " ").replace("\\t", " ").replace("ctn", " ")
     cleaned = cleaned.replace("\r", " ").replace("\t", " ").replace("\n", " ")
@@ -113,215 +140,308 @@ def _use_nvenc() -> bool:
     return shutil.which("nvidia-smi") is not None
 
 
-def _build_drawtext_filter(
-    text: str,
-    font_size: int,
-    y_expr: str,
-    box_color: str,
-    enable_expr: str | None = None,
-) -> str:
-    font_path = _get_font_path()
-    parts = ["drawtext"]
-    if font_path:
-        safe_font = font_path.replace("\\", "\\\\").replace(":", "\\:")
-        parts.append(f"fontfile='{safe_font}'")
-    textfile = _write_textfile(text)
-    safe_textfile = _escape_filter_path(textfile)
-    parts.append(f"textfile='{safe_textfile}'")
-    parts.append("fontcolor=white")
-    parts.append(f"fontsize={font_size}")
-    parts.append("box=1")
-    parts.append(f"boxcolor={box_color}")
-    parts.append("boxborderw=12")
-    parts.append("x=(w-text_w)/2")
-    parts.append(f"y={y_expr}")
-    parts.append("line_spacing=6")
-    if enable_expr:
-        parts.append(f"enable='{enable_expr}'")
+def _previews_enabled() -> bool:
+    return os.getenv("RENDER_THUMBNAILS") != "0"
+
+
+def _preview_paths(output_path: Path) -> tuple[Path, Path]:
     return (
-        "drawtext=" + ":".join(parts[1:]) if len(parts) > 1 else "drawtext"
+        THUMBNAILS_DIR / f"{output_path.stem}.jpg",
+        THUMBNAILS_DIR / f"{output_path.stem}_sprite.jpg",
     )
 
 
-def _render_with_ffmpeg(
-    input_path: Path,
-    output_path: Path,
+def _build_caption_overlays(
     top_text: str,
     bottom_text: str,
-) -> Path:
-    scale_filter = (
-        "scale=720:1280:force_original_aspect_ratio=decrease,"
-        "pad=720:1280:(ow-iw)/2:(oh-ih)/2"
-    )
-    filters: list[str] = []
+    end_start: float,
+) -> list[tuple[CaptionLayer, str, str | None]]:
+    font_path = _get_font_path()
+    overlays: list[tuple[CaptionLayer, str, str | None]] = []
     if top_text.strip():
         normalized_top = _wrap_multiline(top_text, width_chars=20, max_lines=3)
         top_font = _auto_font_size(normalized_top, 52, width_chars=20)
-        filters.append(
-            _build_drawtext_filter(
-                normalized_top,
-                font_size=top_font,
-                y_expr="40",
-                box_color="black@0.55",
-            )
+        layer = render_caption_layer(
+            normalized_top, font_path, top_font, box_color="black@0.55"
         )
+        overlays.append((layer, str(40 - layer.border), None))
     if bottom_text.strip():
         normalized_bottom = _wrap_multiline(
             bottom_text, width_chars=20, max_lines=3
         )
         bottom_font = _auto_font_size(normalized_bottom, 56, width_chars=20)
-        filters.append(
-            _build_drawtext_filter(
-                normalized_bottom,
-                font_size=bottom_font,
-                y_expr="h-210",
-                box_color="orange@0.45",
-            )
+        layer = render_caption_layer(
+            normalized_bottom, font_path, bottom_font, box_color="orange@0.45"
         )
-    duration = _get_video_duration(input_path)
-    end_start = max(0.0, duration - 1.5)
-    end_filter = _build_drawtext_filter(
+        overlays.append((layer, f"H-{210 + layer.border}", None))
+    end_layer = render_caption_layer(
         _wrap_for_width("구매 링크는 댓글 확인!", width_chars=20),
-        font_size=64,
-        y_expr="(h-text_h)/2",
+        font_path,
+        64,
         box_color="black@0.6",
-        enable_expr=f"gte(t\\,{end_start:.2f})",
     )
-    filters.append(end_filter)
-    video_filter = ",".join([scale_filter, *filters])
+    overlays.append((end_layer, "(H-h)/2", f"gte(t,{end_start:.2f})"))
+    return overlays
+
+
+def _build_video_graph(
+    scale_filter: str,
+    variant_overlays: list[list[tuple[CaptionLayer, str, str | None]]],
+    first_input: int,
+) -> tuple[str, list[str]]:
+    count = len(variant_overlays)
+    base_labels = [f"base{index}" for index in range(count)]
+    if count == 1:
+        parts = [f"[0:v]{scale_filter}[base0]"]
+    else:
+        split_outputs = "".join(f"[{label}]" for label in base_labels)
+        parts = [f"[0:v]{scale_filter},split={count}{split_outputs}"]
+
+    next_input = first_input
+    out_labels: list[str] = []
+    for index, overlays in enumerate(variant_overlays):
+        label = base_labels[index]
+        for position, (_, y_expr, enable_expr) in enumerate(overlays):
+            is_last = position == len(overlays) - 1
+            out_label = f"v{index}" if is_last else f"v{index}_{position}"
+            options = f"x=(W-w)/2:y={y_expr}"
+            if enable_expr:
+                options += f":enable='{enable_expr}'"
+            parts.append(f"[{label}][{next_input}:v]overlay={options}[{out_label}]")
+            next_input += 1
+            label = out_label
+        out_labels.append(f"[{label}]")
+    return ";".join(parts), out_labels
+
+
+def _build_audio_graph(
+    count: int, has_audio: bool, bgm_input: int | None, bgm_volume: float = 1.0
+) -> tuple[str | None, list[str]]:
+    if bgm_input is None:
+        return None, ["0:a?"] * count
+    labels = [f"[a{index}]" for index in range(count)]
+    split = f",asplit={count}" if count > 1 else ""
+    bgm_source = f"[{bgm_input}:a]"
+    prefix = ""
+    if bgm_volume != 1.0:
+        prefix = f"{bgm_source}volume={bgm_volume}[bgm];"
+        bgm_source = "[bgm]"
+    if has_audio:
+        graph = (
+            f"{prefix}[0:a]{bgm_source}"
+            "amix=inputs=2:duration=shortest:dropout_transition=2"
+            f"{split}{''.join(labels)}"
+        )
+        return graph, labels
+    if bgm_volume == 1.0:
+        # 미리 정규화된 BGM은 필터 없이 그대로 매핑합니다.
+        return None, [f"{bgm_input}:a"] * count
+    graph = f"[{bgm_input}:a]volume={bgm_volume}{split}{''.join(labels)}"
+    return graph, labels
+
+
+def _build_filter_plan(
+    scale_filter: str,
+    variant_overlays: list[list[tuple[CaptionLayer, str, str | None]]],
+    has_audio: bool,
+    bgm: BgmAsset | None,
+    previews: list[bool] | None = None,
+    sprite_interval: float = 1.0,
+) -> tuple[list[Path], str, list[list[str]], list[tuple[int, str, list[str]]]]:
+    """입력 0=원본, 1..N=자막 PNG, 마지막=BGM 순서의 filter_complex와 출력별 -map을 만듭니다.
+
+    previews[i]가 True인 변형은 같은 그래프에서 대표 프레임(thumbnail)과 5x5 스프라이트도 뽑습니다.
+    """
+    image_inputs = [
+        layer.path for overlays in variant_overlays for layer, _, _ in overlays
+    ]
+    video_graph, video_labels = _build_video_graph(
+        scale_filter, variant_overlays, first_input=1
+    )
+    bgm_input = 1 + len(image_inputs) if bgm else None
+    audio_graph, audio_maps = _build_audio_graph(
+        len(variant_overlays), has_audio, bgm_input, bgm.volume if bgm else 1.0
+    )
+    graph_parts = [video_graph]
+    preview_maps: list[tuple[int, str, list[str]]] = []
+    for index, wants_preview in enumerate(previews or []):
+        if not wants_preview:
+            continue
+        source = video_labels[index]
+        video_labels[index] = f"[vmain{index}]"
+        # 썸네일도 스프라이트와 같은 샘플(영상 전체에 25장)에서 고릅니다. 앞 150프레임만
+        # 보면 인트로 타이틀 카드가 뽑히기 쉽습니다.
+        graph_parts.append(
+            f"{source}split=2[vmain{index}][vsample{index}];"
+            f"[vsample{index}]fps=1/{sprite_interval:.3f},"
+            f"split=2[vthumb{index}][vsprite{index}];"
+            f"[vthumb{index}]thumbnail=25[thumb{index}];"
+            f"[vsprite{index}]scale=144:256,tile=5x5[sprite{index}]"
+        )
+        preview_maps.append((index, "thumbnail", ["-map", f"[thumb{index}]"]))
+        preview_maps.append((index, "sprite", ["-map", f"[sprite{index}]"]))
+    if audio_graph is not None:
+        graph_parts.append(audio_graph)
+    output_maps = [
+        ["-map", video_label, "-map", audio_map]
+        for video_label, audio_map in zip(video_labels, audio_maps)
+    ]
+    return image_inputs, ";".join(graph_parts), output_maps, preview_maps
+
+
+def _render_variants(
+    input_path: Path,
+    variants: list[RenderVariant],
+    threads: int | None = None,
+    timeout: float | None = None,
+    on_progress: ProgressCallback | None = None,
+) -> list[Path]:
+    """원본을 한 번만 디코드/스케일하고 split으로 자막 변형마다 출력 파일을 씁니다."""
+    scale_filter = (
+        "scale=720:1280:force_original_aspect_ratio=decrease,"
+        "pad=720:1280:(ow-iw)/2:(oh-ih)/2"
+    )
+    info = probe_media(input_path)
+    duration = info.duration if info else 0.0
+    end_start = max(0.0, duration - 1.5)
 
-    bgm_path = _pick_bgm_path()
+    bgm = get_bgm_library().pick(duration)
     use_nvenc = _use_nvenc()
     codec = "h264_nvenc" if use_nvenc else "libx264"
     preset = "p4" if use_nvenc else "ultrafast"
-    has_audio = _has_audio_stream(input_path)
-
-    def _build_cmd(filter_value: str) -> list[str]:
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(input_path),
-        ]
-        if bgm_path:
-            cmd += ["-stream_loop", "-1", "-i", str(bgm_path)]
-
-        if bgm_path and has_audio:
-            filter_complex = (
-                f"[0:v]{filter_value}[v];"
-                "[1:a]volume=0.3[a1];"
-                "[0:a][a1]amix=inputs=2:duration=shortest:dropout_transition=2[a]"
-            )
-            cmd += [
-                "-filter_complex",
-                filter_complex,
-                "-map",
-                "[v]",
-                "-map",
-                "[a]",
-                "-shortest",
-            ]
-        elif bgm_path:
-            filter_complex = f"[0:v]{filter_value}[v];[1:a]volume=0.3[a]"
-            cmd += [
-                "-filter_complex",
-                filter_complex,
-                "-map",
-                "[v]",
-                "-map",
-                "[a]",
-                "-shortest",
-            ]
-        else:
-            cmd += ["-vf", filter_value]
+    font_signature = file_signature(_get_font_path())
+    bgm_signature = None
+    if bgm:
+        bgm_signature = {
+            "source": file_signature(bgm.source),
+            "length_sec": bgm.length_sec,
+            "volume": bgm.volume,
+        }
+
+    pending: list[tuple[RenderVariant, str | None]] = []
+    for variant in variants:
+        fingerprint = render_fingerprint(
+            input_path,
+            top_text=variant.top_text,
+            bottom_text=variant.bottom_text,
+            video_filter_base=scale_filter,
+            end_start=f"{end_start:.2f}",
+            bgm=bgm_signature,
+            font=font_signature,
+            codec=codec,
+            preset=preset,
+        )
+        if reuse_render(fingerprint, variant.output_path):
+            print(f"[CACHE] render unchanged; reusing {variant.output_path}")
+            continue
+        pending.append((variant, fingerprint))
+    if not pending:
+        return [variant.output_path for variant in variants]
+
+    has_audio = bool(info and info.has_audio)
+    variant_overlays = [
+        _build_caption_overlays(variant.top_text, variant.bottom_text, end_start)
+        for variant, _ in pending
+    ]
+    previews = [
+        _previews_enabled() and variant.thumbnail_path is not None
+        for variant, _ in pending
+    ]
+    # 스프라이트 25칸을 영상 전체에 고르게 채우는 샘플 간격입니다.
+    sprite_interval = max(0.2, duration / 25) if duration else 1.0
+    image_inputs, filter_complex, output_maps, preview_maps = _build_filter_plan(
+        scale_filter, variant_overlays, has_audio, bgm, previews, sprite_interval
+    )
+    bgm_args: list[str] = []
+    if bgm:
+        bgm_args = ["-stream_loop", "-1"] if bgm.needs_loop else []
+        bgm_args += ["-i", str(bgm.path)]
+    preflight_inputs = [
+        synthetic_av_input(
+            info.width if info else 0,
+            info.height if info else 0,
+            info.fps if info else 0.0,
+            has_audio,
+        ),
+        *[["-i", str(path)] for path in image_inputs],
+    ]
+    if bgm:
+        preflight_inputs.append(synthetic_audio_input())
+    captions_ok = validate_filter_graph(
+        filter_complex,
+        preflight_inputs,
+        output_maps + [maps for _, _, maps in preview_maps],
+    )
+    if not captions_ok:
+        # 자막 없는 영상이 정상 렌더처럼 게시되지 않도록 상품을 실패로 남깁니다.
+        raise CaptionPreflightFailed(
+            "CAPTION_PREFLIGHT_FAILED caption graph failed ffmpeg preflight"
+        )
 
+    # 예전 캐시가 만든 하드링크일 수 있으므로 덮어쓰기 전에 끊어 새 inode에 씁니다.
+    for variant, _ in pending:
+        variant.output_path.unlink(missing_ok=True)
+    cmd = ["ffmpeg", "-y", "-i", str(input_path)]
+    for path in image_inputs:
+        cmd += ["-i", str(path)]
+    cmd += bgm_args
+    cmd += ["-filter_complex", filter_complex]
+    thread_count = str(resolve_threads_per_job(threads))
+    for (variant, _), maps in zip(pending, output_maps):
+        cmd += maps
+        if bgm:
+            cmd += ["-shortest"]
         cmd += [
             "-c:v",
             codec,
             "-preset",
             preset,
             "-threads",
-            "4",
+            thread_count,
             "-c:a",
             "aac",
-            str(output_path),
+            str(variant.output_path),
         ]
-        return cmd
-
-    cmd = _build_cmd(video_filter)
-    result = subprocess.run(cmd, capture_output=True, check=False)
+    for index, kind, maps in preview_maps:
+        variant = pending[index][0]
+        target = variant.thumbnail_path if kind == "thumbnail" else variant.sprite_path
+        if target is None:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        cmd += [*maps, "-frames:v", "1", "-update", "1", "-q:v", "3", str(target)]
+
+    result = run_ffmpeg(
+        cmd,
+        job_id=pending[0][0].output_path.stem,
+        total_sec=duration or None,
+        on_progress=on_progress,
+        timeout=timeout,
+    )
     if result.returncode != 0:
-        stderr = result.stderr.decode("utf-8", errors="ignore") if result.stderr else ""
-        lowered = stderr.lower()
-        if "subtitle filter failed" in lowered or "drawtext" in lowered:
-            fallback_cmd = _build_cmd(scale_filter)
-            fallback_result = subprocess.run(
-                fallback_cmd, capture_output=True, check=False
-            )
-            if fallback_result.returncode == 0:
-                print(
-                    "[WARN] drawtext failed; rendered without captions for fallback."
-                )
-                return output_path
-        raise RuntimeError(stderr.strip() or "ffmpeg failed")
-    return output_path
-
-
-def _has_audio_stream(input_path: Path) -> bool:
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-select_streams",
-                "a",
-                "-show_entries",
-                "stream=codec_type",
-                "-of",
-                "csv=p=0",
-                str(input_path),
-            ],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        return bool(result.stdout.strip())
-    except Exception:
-        return False
-
-
-def _escape_filter_path(path: str) -> str:
-    return path.replace("\\", "\\\\").replace(":", "\\:")
+        raise RuntimeError(result.stderr.strip() or "ffmpeg failed")
+    for variant, fingerprint in pending:
+        record_render(fingerprint, variant.output_path)
+    return [variant.output_path for variant in variants]
 
 
-def _write_textfile(text: str) -> str:
-    filename = f"text_{abs(hash(text))}.txt"
-    path = PROCESSED_DIR / filename
-    path.write_text(text, encoding="utf-8")
-    return str(path)
-
-
-def _get_video_duration(input_path: Path) -> float:
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-show_entries",
-                "format=duration",
-                "-of",
-                "default=noprint_wrappers=1:nokey=1",
-                str(input_path),
-            ],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        return float(result.stdout.strip() or 0)
-    except Exception:
-        return 0.0
+def _render_with_ffmpeg(
+    input_path: Path,
+    output_path: Path,
+    top_text: str,
+    bottom_text: str,
+    threads: int | None = None,
+    timeout: float | None = None,
+    on_progress: ProgressCallback | None = None,
+) -> Path:
+    variant = RenderVariant(output_path, top_text, bottom_text)
+    _render_variants(
+        input_path,
+        [variant],
+        threads=threads,
+        timeout=timeout,
+        on_progress=on_progress,
+    )
+    return output_path
 
 
 def _build_output_name(product) -> str:
@@ -367,98 +487,216 @@ def process_stock_video(
         _wrap_for_width(f"특징: {feature_text}", width_chars=20, max_lines=3),
     ]
     top_text = "\n".join([line for line in info_lines if line.strip()])
-    bottom_text = _wrap_for_width(_pick_cta_text(), width_chars=20, max_lines=3)
+    bottom_text = _wrap_for_width(
+        _pick_cta_text(seed=clean_title), width_chars=20, max_lines=3
+    )
     return _render_with_ffmpeg(raw_path, output_path, top_text, bottom_text)
 
 
+def _build_channel_captions(
+    product, channel_settings: Channel | None
+) -> tuple[str, str]:
+    title = _clean_text(product.title or "상품 정보")
+    subtitle_style = (
+        channel_settings.subtitle_style if channel_settings else "BOTH"
+    )
+    tone = channel_settings.tone if channel_settings else "INFORMAL"
+    title_prefix = channel_settings.title_prefix if channel_settings else None
+    hashtag_template = (
+        channel_settings.hashtag_template if channel_settings else None
+    )
+
+    if title_prefix:
+        title = f"{_clean_text(title_prefix)} {title}".strip()
+
+    top_text = _wrap_for_width(title, width_chars=20, max_lines=3)
+    bottom_text = _pick_cta_text_by_tone(tone, seed=str(product.id))
+    if hashtag_template:
+        template = _clean_text(hashtag_template)
+        if "{title}" in template:
+            template = template.replace("{title}", _clean_text(title))
+        bottom_text = f"{bottom_text}\n{template}"
+
+    style = (subtitle_style or "BOTH").upper()
+    if style == "TOP":
+        bottom_text = ""
+    elif style == "BOTTOM":
+        top_text = ""
+    return top_text, bottom_text
+
+
+def _build_render_job(
+    product, channel_id, channel_settings: Channel | None
+) -> RenderJob | None:
+    raw_path = RAW_DIR / _build_raw_name(product)
+    if not raw_path.exists():
+        return None
+
+    output_path = PROCESSED_DIR / _build_output_name(product)
+    top_text, bottom_text = _build_channel_captions(product, channel_settings)
+    thumbnail_path, sprite_path = _preview_paths(output_path)
+    variant = RenderVariant(
+        output_path=output_path,
+        top_text=top_text,
+        bottom_text=bottom_text,
+        context={"channel_id": channel_id, "source_url": product.origin_url},
+        thumbnail_path=thumbnail_path,
+        sprite_path=sprite_path,
+    )
+    return RenderJob(
+        key=str(product.id),
+        input_path=raw_path,
+        variants=[variant],
+        context={"product": product},
+    )
+
+
+def _build_fanout_job(product, channels: list[Channel]) -> RenderJob | None:
+    raw_path = RAW_DIR / _build_raw_name(product)
+    if not raw_path.exists() or not channels:
+        return None
+
+    base_name = _build_output_name(product)[: -len("_final.mp4")]
+    variants: list[RenderVariant] = []
+    for channel in channels:
+        top_text, bottom_text = _build_channel_captions(product, channel)
+        channel_tag = str(channel.id).split("-")[0]
+        output_path = PROCESSED_DIR / f"{base_name}_{channel_tag}_final.mp4"
+        thumbnail_path, sprite_path = _preview_paths(output_path)
+        variants.append(
+            RenderVariant(
+                output_path=output_path,
+                top_text=top_text,
+                bottom_text=bottom_text,
+                thumbnail_path=thumbnail_path,
+                sprite_path=sprite_path,
+                context={
+                    "channel_id": channel.id,
+                    # video_assets.source_url이 유니크라 채널별 자산은 채널 id를 붙여 구분합니다.
+                    "source_url": f"{product.origin_url}#channel={channel.id}",
+                },
+            )
+        )
+    return RenderJob(
+        key=str(product.id),
+        input_path=raw_path,
+        variants=variants,
+        context={"product": product},
+    )
+
+
 def process_downloaded(
     limit: int | None = None,
     track: str | None = None,
     product_ids: set[str] | None = None,
+    workers: int | str | None = None,
+    threads_per_job: int | None = None,
+    timeout: float | None = None,
+    fanout: bool | None = None,
+    on_progress: ProgressCallback | None = None,
 ) -> list[Path]:
-    manager = DatabaseManager()
-    products = manager.get_products_by_status("DOWNLOADED")
-    if track:
-        products = [item for item in products if item.track == track]
-    if product_ids:
-        products = [item for item in products if str(item.id) in product_ids]
-    products.sort(key=lambda item: 0 if item.track == "MANUAL" else 1)
-    if limit is not None:
-        products = products[:limit]
+    """DOWNLOADED 상품을 렌더하고 출력 경로를 반환합니다.
 
-    processed: list[Path] = []
-    for product in products:
-        raw_path = RAW_DIR / _build_raw_name(product)
-        if not raw_path.exists():
-            continue
+    한 상품이 실패해도 나머지는 계속 렌더하고 DB에 반영한 뒤, 실패가 하나라도 있으면
+    마지막에 RenderBatchError(processed, failures=[(origin_url, 메시지)])를 던집니다.
+    """
+    manager = DatabaseManager()
+    rows = manager.iter_products_for_render(
+        status="DOWNLOADED",
+        track=track,
+        product_ids=product_ids,
+        limit=limit,
+        default_channel_id=os.getenv("DEFAULT_CHANNEL_ID"),
+    )
 
-        output_path = PROCESSED_DIR / _build_output_name(product)
-        title = _clean_text(product.title or "상품 정보")
-        channel_id = None
-        channel_settings: Channel | None = None
-        with manager._session() as session:
-            existing = session.scalars(
-                select(VideoAsset)
-                .where(VideoAsset.product_id == product.id)
-                .order_by(VideoAsset.created_at.desc())
-                .limit(1)
-            ).first()
-            if existing and existing.channel_id:
-                channel_id = existing.channel_id
-                channel_settings = session.get(Channel, channel_id)
-            else:
-                env_channel = os.getenv("DEFAULT_CHANNEL_ID")
-                if env_channel:
-                    channel_id = env_channel
-                    channel_settings = session.get(Channel, env_channel)
-
-        subtitle_style = (
-            channel_settings.subtitle_style if channel_settings else "BOTH"
-        )
-        tone = channel_settings.tone if channel_settings else "INFORMAL"
-        title_prefix = channel_settings.title_prefix if channel_settings else None
-        hashtag_template = (
-            channel_settings.hashtag_template if channel_settings else None
+    if fanout is None:
+        fanout = os.getenv("RENDER_FANOUT") == "1"
+    if fanout:
+        channels = list(manager.get_active_channels())
+        jobs = (_build_fanout_job(product, channels) for product, _, _ in rows)
+    else:
+        jobs = (
+            _build_render_job(product, channel_id, channel)
+            for product, channel_id, channel in rows
         )
+    pool = RenderPool(
+        _render_variants,
+        workers=workers,
+        threads_per_job=threads_per_job,
+        timeout=timeout,
+        on_progress=on_progress,
+    )
 
-        if title_prefix:
-            title = f"{_clean_text(title_prefix)} {title}".strip()
-
-        top_text = _wrap_for_width(title, width_chars=20, max_lines=3)
-        bottom_text = _pick_cta_text_by_tone(tone)
-        if hashtag_template:
-            template = _clean_text(hashtag_template)
-            if "{title}" in template:
-                template = template.replace("{title}", _clean_text(title))
-            bottom_text = f"{bottom_text}\n{template}"
-
-        style = (subtitle_style or "BOTH").upper()
-        if style == "TOP":
-            bottom_text = ""
-        elif style == "BOTTOM":
-            top_text = ""
-
-        _render_with_ffmpeg(raw_path, output_path, top_text, bottom_text)
+    processed: list[Path] = []
+    failures: list[tuple[str, str]] = []
+    for result in pool.imap(job for job in jobs if job is not None):
+        product = result.job.context["product"]
+        if not result.success:
+            print(f"FAILED {product.origin_url}: {result.message}")
+            failures.append((product.origin_url, result.message))
+            continue
 
+        raw_path = result.job.input_path
+        info = probe_media(raw_path)
         manager.update_product_status_by_id(product.id, "PROCESSED")
-        manager.upsert_video_asset(
-            product_id=product.id,
-            source_url=product.origin_url,
-            channel_id=channel_id,
-            raw_path=str(raw_path),
-            processed_path=str(output_path),
-            status=PipelineStatus.PROCESSED,
-        )
+        for variant in result.job.variants:
+            thumbnail_path = variant.thumbnail_path
+            if thumbnail_path is not None and not thumbnail_path.exists():
+                thumbnail_path = None
+            manager.upsert_video_asset(
+                product_id=product.id,
+                source_url=variant.context["source_url"],
+                channel_id=variant.context["channel_id"],
+                raw_path=str(raw_path),
+                processed_path=str(variant.output_path),
+                thumbnail_path=str(thumbnail_path) if thumbnail_path else None,
+                status=PipelineStatus.PROCESSED,
+                duration_sec=int(round(info.duration)) if info else None,
+            )
+            print(
+                f"PROCESSED {product.origin_url} -> {variant.output_path} "
+                f"({result.elapsed_sec:.1f}s)"
+            )
+            processed.append(variant.output_path)
         if os.getenv("DELETE_RAW_AFTER_PROCESS") == "1":
-            raw_path.unlink(missing_ok=True)
-        print(f"PROCESSED {product.origin_url} -> {output_path}")
-        processed.append(output_path)
+            # raw는 blob 하드링크라서 참조까지 지워야 blob 공간이 회수됩니다.
+            blob_store.release(raw_path)
 
+    if failures:
+        raise RenderBatchError(processed, failures)
     return processed
 
 
 def main() -> None:
-    process_downloaded()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render DOWNLOADED products")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--track", default=None)
+    parser.add_argument(
+        "--workers", default=None, help="Parallel render workers or 'auto'"
+    )
+    parser.add_argument("--threads", type=int, default=None, help="-threads per job")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per job")
+    parser.add_argument(
+        "--fanout",
+        action="store_true",
+        default=None,
+        help="Render one output per active channel from a single decode",
+    )
+    args = parser.parse_args()
+
+    try:
+        process_downloaded(
+            limit=args.limit,
+            track=args.track,
+            workers=args.workers,
+            threads_per_job=args.threads,
+            timeout=args.timeout,
+            fanout=args.fanout,
+        )
+    except RenderBatchError as exc:
+        raise SystemExit(f"{exc} ({len(exc.processed)} rendered)") from exc
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import atexit
+import calendar
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from storage_paths import CACHE_DIR, ensure_storage_dirs
+
+
+ensure_storage_dirs()
+YTDLP_CACHE_DIR = CACHE_DIR / "ytdlp"
+DEFAULT_TTL_SEC = 6 * 3600
+# 서명 URL이 곧 만료되면 다운로드 도중 403이 나므로 여유를 둡니다.
+EXPIRY_MARGIN_SEC = 300
+# 출력 경로/로그 옵션은 추출 결과에 영향이 없으므로 캐시 키에서 뺍니다.
+_NON_EXTRACT_OPTS = {
+    "outtmpl",
+    "paths",
+    "merge_output_format",
+    "quiet",
+    "no_warnings",
+    "noprogress",
+    "progress_hooks",
+    "postprocessor_hooks",
+    "logger",
+}
+# (스레드 id, 옵션 키)별 YoutubeDL. 배치가 끝나면 close_all()로 정리합니다.
+_instances: dict[tuple[int, str], Any] = {}
+_instances_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    try:
+        return float(os.getenv("YTDLP_CACHE_TTL_SEC") or DEFAULT_TTL_SEC)
+    except ValueError:
+        return DEFAULT_TTL_SEC
+
+
+def _opts_key(opts: dict[str, Any]) -> str:
+    payload = json.dumps(opts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(target: str, opts: dict[str, Any]) -> Path:
+    extract_opts = {k: v for k, v in opts.items() if k not in _NON_EXTRACT_OPTS}
+    key = hashlib.sha1(
+        f"{target}\n{_opts_key(extract_opts)}".encode("utf-8")
+    ).hexdigest()
+    return YTDLP_CACHE_DIR / f"{key}.json"
+
+
+def get_ydl(opts: dict[str, Any]):
+    """같은 옵션이면 스레드마다 YoutubeDL 인스턴스 하나를 재사용합니다."""
+    from yt_dlp import YoutubeDL
+
+    key = (threading.get_ident(), _opts_key(opts))
+    with _instances_lock:
+        ydl = _instances.get(key)
+        if ydl is None:
+            ydl = _instances[key] = YoutubeDL(dict(opts))
+    return ydl
+
+
+def close_all() -> None:
+    """캐시한 YoutubeDL을 with 블록을 벗어날 때처럼 닫습니다(쿠키 저장, 핸들 정리)."""
+    with _instances_lock:
+        instances = list(_instances.values())
+        _instances.clear()
+    for ydl in instances:
+        try:
+            ydl.__exit__(None, None, None)
+        except Exception as exc:
+            print(f"⚠️ YoutubeDL 정리 실패: {exc}")
+
+
+# 배치 중간에 예외로 빠져나가도 프로세스가 끝날 때는 정리합니다.
+atexit.register(close_all)
+
+
+def _url_expiry(url: str) -> float | None:
+    """서명 URL의 만료 시각(epoch)을 쿼리 파라미터에서 읽습니다."""
+    query = parse_qs(urlparse(url).query)
+    params = {key.lower(): values[0] for key, values in query.items() if values}
+    for key in ("expire", "expires", "x-expires", "e"):
+        value = params.get(key)
+        if value and value.isdigit() and len(value) >= 9:
+            return float(value)
+    amz_date = params.get("x-amz-date")
+    amz_expires = params.get("x-amz-expires")
+    if amz_date and amz_expires and amz_expires.isdigit():
+        try:
+            signed_at = calendar.timegm(time.strptime(amz_date, "%Y%m%dT%H%M%SZ"))
+        except ValueError:
+            return None
+        return float(signed_at + int(amz_expires))
+    # 구글 CDN은 경로에 /expire/<epoch>/ 형태로 넣기도 합니다.
+    match = re.search(r"/expire/(\d{9,})/", url)
+    return float(match.group(1)) if match else None
+
+
+def _earliest_expiry(info: Any) -> float | None:
+    expiries: list[float] = []
+
+    def _walk(node: Any) -> None:
+        if isinstance(node, dict):
+            url = node.get("url")
+            if isinstance(url, str):
+                expiry = _url_expiry(url)
+                if expiry:
+                    expiries.append(expiry)
+            for key in ("formats", "requested_formats", "entries"):
+                children = node.get(key)
+                if isinstance(children, list):
+                    for child in children:
+                        _walk(child)
+
+    _walk(info)
+    return min(expiries) if expiries else None
+
+
+def _read_entry(path: Path) -> dict[str, Any] | None:
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    if now - entry.get("fetched_at", 0) > _ttl():
+        return None
+    expires_at = entry.get("expires_at")
+    if expires_at and now + EXPIRY_MARGIN_SEC >= expires_at:
+        return None
+    return entry
+
+
+def is_fresh(target: str, opts: dict[str, Any]) -> bool:
+    return _read_entry(_cache_path(target, opts)) is not None
+
+
+def extract_info(
+    target: str, opts: dict[str, Any], refresh: bool = False
+) -> dict[str, Any] | None:
+    """URL 또는 검색어(ytsearch1:...)의 extract_info 결과를 TTL/서명 만료 기준으로 캐시합니다."""
+    path = _cache_path(target, opts)
+    if not refresh:
+        entry = _read_entry(path)
+        if entry is not None:
+            return entry.get("info")
+
+    ydl = get_ydl(opts)
+    info = ydl.extract_info(target, download=False)
+    if info is None:
+        return None
+    info = ydl.sanitize_info(info)
+    entry = {
+        "target": target,
+        "fetched_at": time.time(),
+        "expires_at": _earliest_expiry(info),
+        "info": info,
+    }
+    try:
+        YTDLP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        pass
+    return info
+
+
+def invalidate(target: str, opts: dict[str, Any]) -> None:
+    _cache_path(target, opts).unlink(missing_ok=True)